@@ -2,33 +2,55 @@ import asyncio
 import base64
 import math
 import os
-from pdb import run
+import shutil
 import subprocess
 from abc import abstractmethod
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from typing import Optional, Sequence
 
 import cv2
 import numpy as np
 from cv2.typing import MatLike
 
 from ..FileTools.File import FileManage, UrlManage
+from ..Metrics.Metrics import traced
+from .Backend import Backend, SubprocessBackend
+from .Frame import FrameHandle, FramePool
+from . import Wait
+from .AppState import AppSnapshot, AppState, AppStateMonitor, SnapshotCache
+from .Match import DEFAULT_SEARCH, ceil_position, locate, match_template, scale_for, template_cache
 
 
 class Adb:
     ADB_TOOLS_URL = "https://googledownloads.cn/android/repository/platform-tools-latest-windows.zip"
 
-    def __init__(self, adb_path: Optional[str] = None, connect_port: int = 7555, max_workers: int = 10):
-        self.adb_path = FileManage(adb_path).file_path if adb_path else None
+    def __init__(
+        self,
+        adb_path: Optional[str] = None,
+        connect_port: int = 7555,
+        max_workers: int = 10,
+        backend: Optional[Backend] = None,
+    ):
+        """backend: 命令执行方式，默认调用真实adb，可替换为录制/回放/合成设备"""
+        self.startupinfo = None
+        self._resetStartupInfo()
+        self.backend = backend if backend else SubprocessBackend(self.startupinfo)
+        if adb_path and self.backend.requires_adb:
+            adb_path = FileManage(adb_path).file_path
+        self.adb_path = adb_path
         self.max_workers = max_workers
         self.connect_port = connect_port
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.semaphore = asyncio.Semaphore(max_workers)
-        self.startupinfo = subprocess.STARTUPINFO()
-        self._resetStartupInfo()
+        # 应用状态快照，get_device 创建的设备共享同一个缓存
+        self.app_states = SnapshotCache()
         self.ready_env()
 
     def _resetStartupInfo(self):
+        if os.name != "nt":
+            return
+        if self.startupinfo is None:
+            self.startupinfo = subprocess.STARTUPINFO()
         self.startupinfo.dwFlags = (
             subprocess.CREATE_NEW_CONSOLE | subprocess.STARTF_USESHOWWINDOW
         )
@@ -38,6 +60,10 @@ class Adb:
         if self.adb_path:
             self.connenct(self.connect_port)
             return
+        if not self.backend.requires_adb or os.name != "nt":
+            self.adb_path = shutil.which("adb") or "adb"
+            self.connenct(self.connect_port)
+            return
         unzip_path = FileManage(UrlManage.dowload(self.ADB_TOOLS_URL)).unzip(
             retain=False
         )
@@ -56,15 +82,12 @@ class Adb:
             )
 
     def run(self, cmd: list[str]):
-        return subprocess.check_output(
-            cmd, startupinfo=self.startupinfo, stderr=subprocess.STDOUT
-        )
+        return self.backend.check_output(cmd)
 
+    @traced("adb_execute", device_arg=1)
     def execute(self, device_id: str, *command):
         cmd = [self.adb_path, "-s", device_id] + list(command)
-        return subprocess.check_output(
-            cmd, startupinfo=self.startupinfo, stderr=subprocess.STDOUT
-        )
+        return self.backend.check_output(cmd)
 
     async def get_devices_async(self):
         async with self.semaphore:
@@ -73,21 +96,41 @@ class Adb:
 
     def get_device_names(self) -> list[str]:
         try:
-            info = subprocess.check_output(
-                [self.adb_path, "devices"], startupinfo=self.startupinfo
-            )
-            devices = list(
-                map(lambda x: x[: x.find("\t")], info.decode().split("\r\n"))
-            )[1:-2]
+            info = self.run([self.adb_path, "devices"])
+            devices = [
+                line[: line.find("\t")]
+                for line in info.decode().splitlines()[1:]
+                if "\t" in line
+            ]
             return devices
         except:
             raise Exception("端口占用")
 
+    def app_snapshots(self, device_ids: Optional[list[str]] = None, ttl: Optional[float] = None) -> dict[str, AppSnapshot]:
+        """并发获取多个设备的应用状态快照，ttl 秒内的快照直接复用"""
+        if device_ids is None:
+            device_ids = self.get_device_names()
+        snapshots = self.executor.map(lambda i: self.app_states.get(self, i, ttl), device_ids)
+        return dict(zip(device_ids, snapshots))
+
+    def watch_apps(
+        self, callback=None, packages: Optional[list[str]] = None, device_ids: Optional[list[str]] = None, interval: float = 1.0
+    ) -> AppStateMonitor:
+        """在后台线程中监控应用状态，变化时调用 callback(AppChange)，返回已启动的监控"""
+        monitor = AppStateMonitor(self, device_ids, interval)
+        if callback:
+            monitor.subscribe(callback, packages)
+        return monitor.start()
+
     @abstractmethod
     def get_device(self, device_id: str = None):
         if not device_id:
             device_id = self.get_device_names()[0]
-        return Device(self.adb_path, device_id, self.max_workers)
+        device = Device(
+            self.adb_path, device_id, self.max_workers, self.backend, self.connect_port
+        )
+        device.app_states = self.app_states
+        return device
 
 
 class ScreenCut:
@@ -116,6 +159,8 @@ class MatchTempleteDetailInfo:
         templeteSize: tuple[int, int],
         matchTempletePoints: list[tuple[int, ...]],
         matchTempleteCenterPoints: list[tuple[int, int]],
+        scale: float = 1.0,
+        score: Optional[float] = None,
     ):
         self.baseGrayScreenshot = baseGrayScreenshot
         self.grayScreenshot = grayScreenshot
@@ -139,13 +184,26 @@ class MatchTempleteDetailInfo:
             matchTempleteCenterPoints[0] if matchTempleteCenterPoints else None
         )
         self.matched = True if self.matchTempletePoint else False
+        self.scale = scale
+        self.score = score
 
 
 class Device(Adb):
     size = None
+    # 模板制作时的横屏分辨率，None表示模板与设备分辨率一致
+    template_base_size: Optional[tuple[int, int]] = None
+    # 最近一次输入的时间（time.monotonic），等待时据此快速重新检查
+    last_input = 0.0
 
-    def __init__(self, adb_path: str, device_id: str, max_workers: int = 10):
-        super().__init__(adb_path, max_workers)
+    def __init__(
+        self,
+        adb_path: str,
+        device_id: str,
+        max_workers: int = 10,
+        backend: Optional[Backend] = None,
+        connect_port: int = 7555,
+    ):
+        super().__init__(adb_path, connect_port, max_workers, backend)
         self.device_id = device_id
         self.size = self.getScreenSize()
 
@@ -164,11 +222,38 @@ class Device(Adb):
         img = await self.convertImg_async(img_bytes)
         return img
 
-    def screenshot(self):
+    @traced("screenshot")
+    def screenshot(self, raw: bool = False):
+        """raw: 传输未压缩的像素数据，省去设备端PNG编码与本地解码"""
+        if raw:
+            return self.convertRawImg(self.execute(self.device_id, "exec-out", "screencap"))
         img_bytes = self.execute(self.device_id, "exec-out", "screencap", "-p")
         img = self.convertImg(img_bytes)
         return img
 
+    @traced("shared_screenshot")
+    def sharedScreenshot(self, pool: FramePool, gray: bool = False, raw: bool = False) -> FrameHandle:
+        """截图写入共享内存帧池，返回可传给其他进程的句柄\n
+        raw截图直接转换到共享内存中，不产生中间数组"""
+        if raw:
+            raw_bytes = self.execute(self.device_id, "exec-out", "screencap")
+            w, h = map(int, np.frombuffer(raw_bytes, np.uint32, 2))
+            header = len(raw_bytes) - w * h * 4
+            pixels = np.frombuffer(raw_bytes, np.uint8, offset=header).reshape(h, w, 4)
+            shape, code = ((h, w), cv2.COLOR_RGBA2GRAY) if gray else ((h, w, 3), cv2.COLOR_RGBA2BGR)
+        else:
+            pixels = self.screenshot()
+            if not gray:
+                return pool.write(pixels)
+            shape, code = pixels.shape[:2], cv2.COLOR_BGR2GRAY
+        handle = pool.acquire(shape)
+        try:
+            cv2.cvtColor(pixels, code, dst=pool.array(handle))
+        except BaseException:
+            pool.release(handle)
+            raise
+        return handle
+
     def get_device(self):
         return self
 
@@ -178,7 +263,11 @@ class Device(Adb):
             return await loop.run_in_executor(self.executor, self.convertImg, img_bytes)
 
     def launch_app(self, activity: str):
-        return self.execute(self.device_id, "shell", "am", "start", activity)
+        try:
+            return self.execute(self.device_id, "shell", "am", "start", activity)
+        finally:
+            # 命令完成后再失效，丢弃执行期间获取的快照
+            self.app_states.invalidate(self.device_id)
     
     def get_app_pid(self, package_name: str) -> str:
         try:
@@ -200,12 +289,35 @@ class Device(Adb):
             return None
     
     def kill_app(self, package_name: str):
-        return self.execute(self.device_id, "shell", "am", "force-stop", package_name)
+        try:
+            return self.execute(self.device_id, "shell", "am", "force-stop", package_name)
+        finally:
+            self.app_states.invalidate(self.device_id)
 
+    def app_snapshot(self, ttl: Optional[float] = None) -> AppSnapshot:
+        """一次adb调用获取全部应用的pid、最上层Activity与状态，ttl 秒内的快照直接复用"""
+        return self.app_states.get(self, self.device_id, ttl)
+
+    def app_state(self, package_name: str, ttl: Optional[float] = None) -> AppState:
+        return self.app_snapshot(ttl).get(package_name)
+
+    def watch_apps(self, callback=None, packages: Optional[list[str]] = None, interval: float = 1.0) -> AppStateMonitor:
+        """监控本设备的应用状态，见 Adb.watch_apps"""
+        return super().watch_apps(callback, packages, [self.device_id], interval)
+
+    @traced("convert_img")
     def convertImg(self, img_bytes) -> MatLike:
         img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_ANYCOLOR)
         return img
 
+    @traced("convert_raw_img")
+    def convertRawImg(self, raw_bytes) -> MatLike:
+        """screencap 原始RGBA数据（不带 -p），文件头为12或16字节"""
+        w, h = map(int, np.frombuffer(raw_bytes, np.uint32, 2))
+        header = len(raw_bytes) - w * h * 4
+        pixels = np.frombuffer(raw_bytes, np.uint8, offset=header).reshape(h, w, 4)
+        return cv2.cvtColor(pixels, cv2.COLOR_RGBA2BGR)
+
     def toGrayImg(self, img: str | MatLike) -> MatLike:
         if isinstance(img, str):
             return cv2.imread(img, cv2.IMREAD_GRAYSCALE)
@@ -214,9 +326,35 @@ class Device(Adb):
         else:
             raise TypeError("图像类型错误")
 
-    def toBase64Img(self, img: MatLike) -> str:
-        """将MatLike对象转换为base64编码"""
-        image_bytes = cv2.imencode('.png', img)[1].tobytes()
+    @staticmethod
+    def encodeImg(
+        img: MatLike, ext: str = ".png", quality: Optional[int] = None, max_side: Optional[int] = None
+    ) -> bytes:
+        """编码图像
+        - ext: .png .jpg .webp
+        - quality: jpg/webp 的质量（0-100）
+        - max_side: 最长边超过该值时等比缩小
+        """
+        if max_side and max(img.shape[:2]) > max_side:
+            scale = max_side / max(img.shape[:2])
+            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        params = []
+        if quality is not None:
+            match ext.lower():
+                case ".jpg" | ".jpeg":
+                    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+                case ".webp":
+                    params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        ok, buf = cv2.imencode(ext, img, params)
+        if not ok:
+            raise ValueError(f"图像编码失败 {ext}")
+        return buf.tobytes()
+
+    def toBase64Img(
+        self, img: MatLike, ext: str = ".png", quality: Optional[int] = None, max_side: Optional[int] = None
+    ) -> str:
+        """将MatLike对象转换为base64编码，参数见 encodeImg"""
+        image_bytes = self.encodeImg(img, ext, quality, max_side)
         base64_image = base64.b64encode(image_bytes).decode('utf-8')
         return base64_image
 
@@ -244,38 +382,44 @@ class Device(Adb):
             return self.size
         else:
             msg = (
-                subprocess.check_output(
-                    [self.adb_path, "-s", self.device_id, "shell", "wm", "size"],
-                    startupinfo=self.startupinfo,
-                )
+                self.execute(self.device_id, "shell", "wm", "size")
                 .decode()
                 .split(" ")[-1]
-                .replace("\r\n", "")
+                .strip()
             )
             w, h = map(int, msg.split("x"))
             self.size = (max(w, h), min(w, h))
         return self.size
 
+    @traced("click")
     def click(self, x: int, y: int):
-        cmd = [
-            self.adb_path,
-            "-s",
-            self.device_id,
-            "shell",
-            "input",
-            "tap",
-            str(x),
-            str(y),
-        ]
-        subprocess.run(cmd, startupinfo=self.startupinfo, check=True)
+        self.execute(self.device_id, "shell", "input", "tap", str(x), str(y))
+        Wait.notify_input(self)
 
     def clickButton(
         self, button: str | MatLike, per: float = 0.9, grayScreenshot: MatLike = None
-    ):
+    ) -> bool:
+        """点击匹配到的第一个位置，未匹配时返回False"""
         locations = self.findImageCenterLocations(
             button, per=per, grayScreenshot=grayScreenshot
         )
+        if not locations:
+            return False
         self.click(*locations[0])
+        return True
+
+    def wait_for(self, target: str | MatLike | Wait.Text, timeout: float = 10.0, **kwargs):
+        """等待模板或文字（Wait.Text）出现，返回匹配结果，超时抛出TimeoutError\n
+        参数见 Wait.wait_any"""
+        return Wait.wait_for(self, target, timeout, **kwargs)
+
+    def wait_gone(self, target: str | MatLike | Wait.Text, timeout: float = 10.0, **kwargs) -> bool:
+        """等待目标消失"""
+        return Wait.wait_gone(self, target, timeout, **kwargs)
+
+    def wait_any(self, targets: list, timeout: float = 10.0, **kwargs) -> tuple[int, object]:
+        """等待任一目标出现，返回 (索引, 匹配结果)"""
+        return Wait.wait_any(self, targets, timeout, **kwargs)
 
     def findImageCenterLocations(
         self,
@@ -291,6 +435,7 @@ class Device(Adb):
         else:
             return None
 
+    @traced("find_image")
     def findImageDetail(
         self,
         button: str | MatLike,
@@ -309,58 +454,88 @@ class Device(Adb):
         else:
             baseGrayScreenshot = grayScreenshot
             screenshot_gray = self.cutScreenshot(grayScreenshot, cutPoints)
-        if isinstance(button, str):
-            template_gray = cv2.imread(button, cv2.IMREAD_GRAYSCALE)
-        elif isinstance(button, MatLike):
-            template_gray = button
-        else:
-            raise TypeError("匹配图像类型错误")
-        matcher = cv2.matchTemplate(
-            screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED
+        template_gray = template_cache.gray(button)
+        matchTempletePoints, matchTempleteCenterPoints = match_template(
+            screenshot_gray, template_gray, per, (x0, y0)
         )
-        locations = np.where(matcher > per)
-        templeteHeight, temleteWidth = template_gray.shape[0:2]
-        if any(locations[0]):
-            tmp_y, tmp_x = self._ceilPosition(locations)
-            matchTempletePoints = [
-                (
-                    (x + x0, y + y0),
-                    (x + x0 + temleteWidth, y + y0),
-                    (x + x0, y + y0 + templeteHeight),
-                    (x + x0 + temleteWidth, y + y0 + templeteHeight),
-                )
-                for x, y in zip(tmp_x, tmp_y)
-            ]
-            matchTempleteCenterPoints = [
-                ((x + temleteWidth // 2) + x0, (y + templeteHeight // 2) + y0)
-                for x, y in zip(tmp_x, tmp_y)
-            ]
-            return MatchTempleteDetailInfo(
-                baseGrayScreenshot=baseGrayScreenshot,
-                grayScreenshot=screenshot_gray,
-                templeteSize=template_gray.shape[1::-1],
-                matchTempletePoints=matchTempletePoints,
-                matchTempleteCenterPoints=matchTempleteCenterPoints,
-            )
+        return MatchTempleteDetailInfo(
+            baseGrayScreenshot=baseGrayScreenshot,
+            grayScreenshot=screenshot_gray,
+            templeteSize=template_gray.shape[1::-1],
+            matchTempletePoints=matchTempletePoints,
+            matchTempleteCenterPoints=matchTempleteCenterPoints,
+        )
+
+    def templateScales(
+        self, base_size: Optional[tuple[int, int]] = None, search: bool | Sequence[float] = False
+    ) -> list[float]:
+        """当前设备需要的模板缩放比例"""
+        scale = scale_for(self.size, base_size if base_size else self.template_base_size)
+        if not search:
+            return [scale]
+        factors = DEFAULT_SEARCH if search is True else search
+        return [scale * i for i in factors]
+
+    def precomputeTemplates(
+        self,
+        templates: list[str | MatLike],
+        base_size: Optional[tuple[int, int]] = None,
+        search: bool | Sequence[float] = False,
+    ):
+        """预先缩放模板，缓存在多个设备间共享"""
+        template_cache.precompute(templates, self.templateScales(base_size, search))
+
+    @traced("find_image_scaled")
+    def findImageDetailScaled(
+        self,
+        button: str | MatLike,
+        cutPoints=None,
+        per: float = 0.9,
+        grayScreenshot=None,
+        base_size: Optional[tuple[int, int]] = None,
+        search: bool | Sequence[float] = False,
+    ) -> MatchTempleteDetailInfo:
+        """按设备分辨率缩放模板后匹配
+        - base_size: 模板制作时的横屏分辨率，默认为 template_base_size
+        - search: 在估计的缩放比例附近搜索，True使用默认倍数，也可传入倍数列表
+        """
+        if cutPoints:
+            x0, y0 = cutPoints[0]
         else:
-            return MatchTempleteDetailInfo(
-                baseGrayScreenshot=baseGrayScreenshot,
-                grayScreenshot=screenshot_gray,
-                templeteSize=template_gray.shape[1::-1],
-                matchTempletePoints=None,
-                matchTempleteCenterPoints=None,
-            )
+            x0, y0 = 0, 0
+        if grayScreenshot is None:
+            baseGrayScreenshot = self.grayScreenshot()
+        else:
+            baseGrayScreenshot = grayScreenshot
+        screenshot_gray = self.cutScreenshot(baseGrayScreenshot, cutPoints)
+        h, w = screenshot_gray.shape[:2]
+
+        best = None
+        for scale in self.templateScales(base_size, search):
+            template_gray = template_cache.get(button, scale)
+            th, tw = template_gray.shape[:2]
+            if th > h or tw > w:
+                continue
+            matcher = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
+            score = cv2.minMaxLoc(matcher)[1]
+            if best is None or score > best[0]:
+                best = (score, scale, template_gray, matcher)
+        if best is None:
+            raise ValueError("模板缩放后大于截图")
+
+        score, scale, template_gray, matcher = best
+        matchTempletePoints, matchTempleteCenterPoints = locate(
+            matcher, template_gray.shape[1::-1], per, (x0, y0)
+        )
+        return MatchTempleteDetailInfo(
+            baseGrayScreenshot=baseGrayScreenshot,
+            grayScreenshot=screenshot_gray,
+            templeteSize=template_gray.shape[1::-1],
+            matchTempletePoints=matchTempletePoints,
+            matchTempleteCenterPoints=matchTempleteCenterPoints,
+            scale=scale,
+            score=score,
+        )
 
     def _ceilPosition(self, locations):
-        tmp_y = [locations[0][0]]
-        tmp_x = [locations[1][0]]
-        for y, x in zip(*locations):
-            if x - 10 >= tmp_x[-1]:
-                tmp_x.append(x)
-                tmp_y.append(y)
-                continue
-            if y - 10 >= tmp_y[-1]:
-                tmp_x.append(x)
-                tmp_y.append(y)
-                continue
-        return tmp_y, tmp_x
+        return ceil_position(locations)
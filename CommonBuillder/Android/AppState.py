@@ -0,0 +1,340 @@
+import re
+import time
+import traceback
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from typing import Callable, Iterable, Iterator, Optional
+
+# 一次 adb shell 同时获取进程列表与Activity栈，旧版本的ps不支持 -A 时退回 ps
+MARKER = "__APPSTATE_DUMPSYS__"
+SNAPSHOT_COMMAND = f"ps -A -o PID,NAME 2>/dev/null || ps; echo {MARKER}; dumpsys activity activities"
+
+RECORD = re.compile(r"ActivityRecord\{[0-9a-f]+ u\d+ ([\w.]+/[\w.$]+)")
+STATE = re.compile(r"(?:^|\s)m?[Ss]tate=([A-Z_]+)")
+RESUMED_PREFIXES = ("mResumedActivity:", "ResumedActivity:", "topResumedActivity=")
+
+
+class AppState:
+    """应用状态，未运行时 pid 为None，没有Activity时 activity 与 state 为None"""
+
+    __slots__ = ("package", "pid", "activity", "state")
+
+    def __init__(
+        self, package: str, pid: Optional[str] = None, activity: Optional[str] = None, state: Optional[str] = None
+    ) -> None:
+        self.package = package
+        self.pid = pid
+        self.activity = activity
+        self.state = state
+
+    @property
+    def running(self) -> bool:
+        return self.pid is not None
+
+    def _key(self) -> tuple:
+        return (self.package, self.pid, self.activity, self.state)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, AppState) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"AppState({self.package!r}, pid={self.pid!r}, activity={self.activity!r}, state={self.state!r})"
+
+
+class AppChange:
+    """两次快照之间应用状态的变化"""
+
+    __slots__ = ("device_id", "package", "old", "new")
+
+    def __init__(self, device_id: str, package: str, old: AppState, new: AppState) -> None:
+        self.device_id = device_id
+        self.package = package
+        self.old = old
+        self.new = new
+
+    @property
+    def started(self) -> bool:
+        return not self.old.running and self.new.running
+
+    @property
+    def stopped(self) -> bool:
+        return self.old.running and not self.new.running
+
+    def __repr__(self) -> str:
+        return f"<AppChange {self.device_id} {self.old} -> {self.new}>"
+
+
+def parse_ps(text: str) -> dict[str, str]:
+    """进程名 -> pid，同名进程取第一个"""
+    lines = text.splitlines()
+    if not lines:
+        return {}
+    header = lines[0].split()
+    if "PID" not in header:
+        return {}
+    index = header.index("PID")
+    processes = {}
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) > index + 1:
+            processes.setdefault(parts[-1], parts[index])
+    return processes
+
+
+def parse_activities(text: str) -> tuple[dict[str, tuple[str, Optional[str]]], Optional[str]]:
+    """解析 dumpsys activity activities\n
+    返回 (包名 -> (最上层的Activity, 状态), 前台的Activity)"""
+    activities: dict[str, tuple[str, Optional[str]]] = {}
+    resumed = None
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(RESUMED_PREFIXES):
+            if resumed is None:
+                match = RECORD.search(line)
+                resumed = match.group(1) if match else None
+            continue
+        if line.startswith(("* ActivityRecord{", "* Hist #", "Hist #")):
+            match = RECORD.search(line)
+            current = match.group(1) if match else None
+            if current:
+                activities.setdefault(current.split("/")[0], (current, None))
+            continue
+        if line.startswith("mActivityComponent="):
+            current = line.split("=", 1)[1].strip()
+            activities.setdefault(current.split("/")[0], (current, None))
+            continue
+        if current:
+            match = STATE.search(line)
+            if match:
+                package = current.split("/")[0]
+                activity, state = activities[package]
+                if activity == current and state is None:
+                    activities[package] = (activity, match.group(1))
+                current = None
+
+    if resumed:
+        activities[resumed.split("/")[0]] = (resumed, "RESUMED")
+    return activities, resumed
+
+
+class AppSnapshot:
+    """某一时刻设备上全部应用的状态，按包名索引"""
+
+    def __init__(
+        self,
+        device_id: str,
+        processes: dict[str, str],
+        activities: dict[str, tuple[str, Optional[str]]],
+        resumed: Optional[str] = None,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        self.device_id = device_id
+        self.processes = processes
+        self.activities = activities
+        self.resumed = resumed
+        # time.monotonic()
+        self.time = time.monotonic() if timestamp is None else timestamp
+
+    @classmethod
+    def parse(cls, device_id: str, output: str) -> "AppSnapshot":
+        ps, _, dumpsys = output.partition(MARKER)
+        activities, resumed = parse_activities(dumpsys)
+        return cls(device_id, parse_ps(ps), activities, resumed)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.time
+
+    @property
+    def foreground(self) -> Optional[str]:
+        """前台应用的包名"""
+        return self.resumed.split("/")[0] if self.resumed else None
+
+    def packages(self) -> set[str]:
+        """有Activity或有同名进程的应用"""
+        return set(self.activities) | {i for i in self.processes if "." in i and not set(i) & {":", "/"}}
+
+    def get(self, package: str) -> AppState:
+        activity, state = self.activities.get(package, (None, None))
+        return AppState(package, self.processes.get(package), activity, state)
+
+    def pid(self, package: str) -> Optional[str]:
+        return self.processes.get(package)
+
+    def activity(self, package: str) -> Optional[str]:
+        return self.activities.get(package, (None, None))[0]
+
+    def __getitem__(self, package: str) -> AppState:
+        return self.get(package)
+
+    def __contains__(self, package: str) -> bool:
+        return package in self.processes or package in self.activities
+
+    def diff(self, previous: "AppSnapshot", packages: Optional[Iterable[str]] = None) -> list[AppChange]:
+        """相对于 previous 发生变化的应用，packages 为None时比较两次快照中出现的全部应用"""
+        if packages is None:
+            packages = sorted(self.packages() | previous.packages())
+        changes = []
+        for package in packages:
+            old, new = previous.get(package), self.get(package)
+            if old != new:
+                changes.append(AppChange(self.device_id, package, old, new))
+        return changes
+
+    def __repr__(self) -> str:
+        return f"<AppSnapshot {self.device_id} processes={len(self.processes)} foreground={self.foreground}>"
+
+
+def take_snapshot(adb, device_id: str) -> AppSnapshot:
+    output = adb.execute(device_id, "shell", SNAPSHOT_COMMAND)
+    return AppSnapshot.parse(device_id, output.decode(errors="replace"))
+
+
+class SnapshotCache:
+    """每个设备的快照在 ttl 秒内复用，同一设备同时只有一次刷新，其他调用者等待其结果\n
+    刷新期间调用了 invalidate 时，这次刷新的结果不会被缓存"""
+
+    def __init__(self, ttl: float = 1.0) -> None:
+        self.ttl = ttl
+        self._lock = Lock()
+        self._device_locks: dict[str, Lock] = {}
+        self._snapshots: dict[str, AppSnapshot] = {}
+        # invalidate 时递增，_epoch 对应 invalidate()（全部设备）
+        self._generations: dict[str, int] = {}
+        self._epoch = 0
+
+    def _generation(self, device_id: str) -> tuple[int, int]:
+        return self._epoch, self._generations.get(device_id, 0)
+
+    def get(self, adb, device_id: str, ttl: Optional[float] = None) -> AppSnapshot:
+        ttl = self.ttl if ttl is None else ttl
+        snapshot = self._snapshots.get(device_id)
+        if snapshot is not None and snapshot.age <= ttl:
+            return snapshot
+        with self._lock:
+            lock = self._device_locks.setdefault(device_id, Lock())
+        with lock:
+            snapshot = self._snapshots.get(device_id)
+            if snapshot is not None and snapshot.age <= ttl:
+                return snapshot
+            with self._lock:
+                generation = self._generation(device_id)
+            snapshot = take_snapshot(adb, device_id)
+            with self._lock:
+                if self._generation(device_id) == generation:
+                    self._snapshots[device_id] = snapshot
+            return snapshot
+
+    def invalidate(self, device_id: Optional[str] = None):
+        with self._lock:
+            if device_id is None:
+                self._snapshots.clear()
+                self._epoch += 1
+            else:
+                self._snapshots.pop(device_id, None)
+                self._generations[device_id] = self._generations.get(device_id, 0) + 1
+
+
+class AppStateMonitor:
+    """定时获取快照，把应用状态的变化推送给订阅者
+    - device_ids: 监控的设备，None为全部已连接设备
+    - interval: 快照间隔（秒），间隔内其他调用者获取的快照会被复用
+    """
+
+    def __init__(
+        self, adb, device_ids: Optional[list[str]] = None, interval: float = 1.0, cache: Optional[SnapshotCache] = None
+    ) -> None:
+        self.adb = adb
+        self.device_ids = device_ids
+        self.interval = interval
+        self.cache = cache if cache is not None else adb.app_states
+        self._subscribers: dict[int, tuple[Callable[[AppChange], None], Optional[frozenset]]] = {}
+        self._next_id = 0
+        self._lock = Lock()
+        self._previous: dict[str, AppSnapshot] = {}
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def subscribe(self, callback: Callable[[AppChange], None], packages: Optional[Iterable[str]] = None) -> Callable:
+        """订阅变化，packages 为None时接收全部应用，返回取消订阅的函数"""
+        with self._lock:
+            subscriber_id = self._next_id
+            self._next_id += 1
+            self._subscribers[subscriber_id] = (callback, frozenset(packages) if packages is not None else None)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.pop(subscriber_id, None)
+
+        return unsubscribe
+
+    def stream(self, packages: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Iterator[AppChange]:
+        """以迭代器的形式接收变化，监控停止或 timeout 秒内没有变化时结束"""
+        changes: Queue = Queue()
+        unsubscribe = self.subscribe(changes.put, packages)
+        try:
+            while not self._stop.is_set():
+                try:
+                    yield changes.get(timeout=timeout if timeout is not None else self.interval)
+                except Empty:
+                    if timeout is not None:
+                        return
+        finally:
+            unsubscribe()
+
+    def poll(self) -> list[AppChange]:
+        """获取一次快照并分发变化，第一次快照只作为基准"""
+        device_ids = self.device_ids if self.device_ids is not None else self.adb.get_device_names()
+        snapshots = self.adb.app_snapshots(device_ids, ttl=self.interval / 2)
+        changes = []
+        for device_id, snapshot in snapshots.items():
+            previous = self._previous.get(device_id)
+            self._previous[device_id] = snapshot
+            if previous is not None and previous is not snapshot:
+                changes.extend(snapshot.diff(previous))
+
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for change in changes:
+            for callback, packages in subscribers:
+                if packages is not None and change.package not in packages:
+                    continue
+                try:
+                    callback(change)
+                except Exception:
+                    traceback.print_exc()
+        return changes
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.poll()
+            except Exception:
+                traceback.print_exc()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - start)))
+
+    def start(self) -> "AppStateMonitor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
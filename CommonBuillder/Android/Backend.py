@@ -0,0 +1,234 @@
+import base64
+import subprocess
+import time
+from abc import abstractmethod
+from hashlib import blake2b
+from json import dumps, loads
+from os.path import exists, join
+from threading import Lock
+from typing import Callable, Optional, Sequence
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from ..FileTools.File import FileManage
+
+PNG_MAGIC = b"\x89PNG"
+
+
+class Backend:
+    """adb命令的执行方式，cmd[0]为adb路径"""
+
+    requires_adb = True
+
+    @abstractmethod
+    def check_output(self, cmd: list[str]) -> bytes:
+        raise NotImplementedError
+
+
+class SubprocessBackend(Backend):
+    """调用真实的adb"""
+
+    def __init__(self, startupinfo=None) -> None:
+        self.startupinfo = startupinfo
+
+    def check_output(self, cmd: list[str]) -> bytes:
+        return subprocess.check_output(
+            cmd, startupinfo=self.startupinfo, stderr=subprocess.STDOUT
+        )
+
+
+class RecordBackend(Backend):
+    """录制另一个backend的命令输出与耗时\n
+    session.jsonl 每行一条记录，较大的输出（截图）以内容摘要命名保存在 blobs/ 下，
+    多次录制到同一目录时不会互相覆盖"""
+
+    SESSION = "session.jsonl"
+    INLINE_LIMIT = 4096
+
+    def __init__(self, backend: Backend, path: str) -> None:
+        self.backend = backend
+        self.requires_adb = backend.requires_adb
+        self.path = path
+        self.blobs_path = join(path, "blobs")
+        FileManage.makedirs(self.blobs_path)
+        self._lock = Lock()
+        self._fp = open(join(path, self.SESSION), "a", encoding="utf-8")
+
+    def check_output(self, cmd: list[str]) -> bytes:
+        start = time.perf_counter()
+        try:
+            output = self.backend.check_output(cmd)
+        except subprocess.CalledProcessError as e:
+            self._record(cmd, e.output or b"", time.perf_counter() - start, e.returncode)
+            raise
+        self._record(cmd, output, time.perf_counter() - start, 0)
+        return output
+
+    def _record(self, cmd: list[str], output: bytes, elapsed: float, returncode: int):
+        record = {"args": cmd[1:], "elapsed": elapsed, "returncode": returncode}
+        with self._lock:
+            if len(output) > self.INLINE_LIMIT:
+                ext = ".png" if output.startswith(PNG_MAGIC) else ".bin"
+                name = blake2b(output, digest_size=16).hexdigest() + ext
+                blob_path = join(self.blobs_path, name)
+                if not exists(blob_path):
+                    with FileManage.atomic_open(blob_path, "wb") as fp:
+                        fp.write(output)
+                record["blob"] = name
+            else:
+                record["output"] = base64.b64encode(output).decode("ascii")
+            self._fp.write(dumps(record, ensure_ascii=False) + "\n")
+            self._fp.flush()
+
+    def close(self):
+        self._fp.close()
+
+
+class ReplayBackend(Backend):
+    """回放RecordBackend的录制结果，不需要adb与设备
+    - realtime: 按录制的耗时等待
+    - strict: 未录制的命令抛出KeyError，否则返回空输出
+    - loop: 同一命令的录制用完后从头循环
+    """
+
+    requires_adb = False
+
+    def __init__(self, path: str, realtime: bool = False, strict: bool = True, loop: bool = True) -> None:
+        self.path = path
+        self.realtime = realtime
+        self.strict = strict
+        self.loop = loop
+        self._lock = Lock()
+        self._records: dict[tuple, list[dict]] = {}
+        self._cursors: dict[tuple, int] = {}
+        self._blobs: dict[str, bytes] = {}
+        with open(join(path, RecordBackend.SESSION), "r", encoding="utf-8") as fp:
+            for line in fp:
+                if line.strip():
+                    record = loads(line)
+                    self._records.setdefault(tuple(record["args"]), []).append(record)
+
+    def _output(self, record: dict) -> bytes:
+        if "blob" not in record:
+            return base64.b64decode(record["output"])
+        name = record["blob"]
+        if name not in self._blobs:
+            with open(join(self.path, "blobs", name), "rb") as fp:
+                self._blobs[name] = fp.read()
+        return self._blobs[name]
+
+    def check_output(self, cmd: list[str]) -> bytes:
+        key = tuple(cmd[1:])
+        records = self._records.get(key)
+        if not records:
+            if self.strict:
+                raise KeyError(f"没有录制的命令: {' '.join(key)}")
+            return b""
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            if index >= len(records):
+                if not self.loop:
+                    raise KeyError(f"录制的命令已用完: {' '.join(key)}")
+                index = 0
+            self._cursors[key] = index + 1
+        record = records[index]
+        if self.realtime:
+            time.sleep(record["elapsed"])
+        output = self._output(record)
+        if record["returncode"]:
+            raise subprocess.CalledProcessError(record["returncode"], cmd, output)
+        return output
+
+
+class SyntheticBackend(Backend):
+    """生成合成画面的虚拟设备
+    - size: 横屏分辨率 (w, h)
+    - frames: 画面列表，或 frame_index -> 画面 的函数，默认为带序号的渐变图
+    - responses: 额外的 命令参数 -> 输出
+    - latency: 每条命令的模拟耗时（秒），用于估算adb往返次数的影响
+    """
+
+    requires_adb = False
+
+    def __init__(
+        self,
+        size: tuple[int, int] = (1280, 720),
+        frames: Optional[Sequence[MatLike] | Callable[[int], MatLike]] = None,
+        devices: Sequence[str] = ("synthetic-0",),
+        responses: dict[tuple, bytes] = None,
+        encoding: str = ".png",
+        latency: float = 0.0,
+    ) -> None:
+        self.size = size
+        self.latency = latency
+        self.devices = list(devices)
+        self.responses = responses if responses else {}
+        self.encoding = encoding
+        self.frames = frames if frames is not None else self.default_frame
+        self.frame_index = 0
+        self.inputs: list[tuple[str, ...]] = []
+        self._encoded: dict[int, bytes] = {}
+        self._lock = Lock()
+
+    def default_frame(self, index: int) -> MatLike:
+        w, h = self.size
+        img = np.zeros((h, w, 3), np.uint8)
+        img[:, :, 0] = np.linspace(0, 255, w, dtype=np.uint8)
+        img[:, :, 1] = np.linspace(0, 255, h, dtype=np.uint8)[:, None]
+        cv2.putText(img, str(index), (w // 2, h // 2), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        return img
+
+    def frame(self) -> tuple[int, MatLike]:
+        with self._lock:
+            index = self.frame_index
+            self.frame_index += 1
+        if callable(self.frames):
+            return index, self.frames(index)
+        index %= len(self.frames)
+        return index, self.frames[index]
+
+    def screencap(self) -> bytes:
+        index, img = self.frame()
+        if callable(self.frames):
+            return cv2.imencode(self.encoding, img)[1].tobytes()
+        if index not in self._encoded:
+            self._encoded[index] = cv2.imencode(self.encoding, img)[1].tobytes()
+        return self._encoded[index]
+
+    def screencap_raw(self) -> bytes:
+        """与 screencap 不带 -p 时的格式一致：w, h, format, colorspace + RGBA"""
+        _, img = self.frame()
+        h, w = img.shape[:2]
+        header = np.array([w, h, 1, 0], np.uint32).tobytes()
+        return header + cv2.cvtColor(img, cv2.COLOR_BGR2RGBA).tobytes()
+
+    def check_output(self, cmd: list[str]) -> bytes:
+        if self.latency:
+            time.sleep(self.latency)
+        args = tuple(cmd[1:])
+        if args in self.responses:
+            return self.responses[args]
+        if args and args[0] == "-s":
+            args = args[2:]
+        match args:
+            case ("devices",):
+                lines = ["List of devices attached"] + [f"{i}\tdevice" for i in self.devices]
+                return ("\r\n".join(lines) + "\r\n\r\n").encode()
+            case ("connect", address):
+                return f"connected to {address}\r\n".encode()
+            case ("exec-out", "screencap", "-p"):
+                return self.screencap()
+            case ("exec-out", "screencap"):
+                return self.screencap_raw()
+            case ("shell", "wm", "size"):
+                w, h = self.size
+                return f"Physical size: {h}x{w}\r\n".encode()
+            case ("shell", "input", *_):
+                self.inputs.append(args[2:])
+                return b""
+            case ("shell", "pidof", *_):
+                raise subprocess.CalledProcessError(1, cmd, b"")
+            case _:
+                return b""
@@ -0,0 +1,160 @@
+from concurrent.futures import Executor, Future
+from multiprocessing.shared_memory import SharedMemory
+from threading import Condition
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from .Match import match_template, template_cache
+
+# 每个缓冲区开头保存 int64 的 generation，用于发现已被回收的帧
+HEADER_SIZE = 8
+DEFAULT_FRAME_BYTES = 2560 * 1440 * 3
+
+
+class StaleFrameError(RuntimeError):
+    pass
+
+
+class FrameHandle:
+    """共享内存中一帧的描述，可以低成本地传给其他进程"""
+
+    __slots__ = ("name", "shape", "dtype", "generation", "slot")
+
+    def __init__(self, name: str, shape: tuple[int, ...], dtype: str, generation: int, slot: int) -> None:
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.generation = generation
+        self.slot = slot
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype, self.generation, self.slot)
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype, self.generation, self.slot = state
+
+    def __repr__(self) -> str:
+        return f"<FrameHandle {self.name} {self.shape} {self.dtype} gen={self.generation}>"
+
+
+def _view(buf, handle: FrameHandle) -> np.ndarray:
+    return np.ndarray(handle.shape, np.dtype(handle.dtype), buffer=buf, offset=HEADER_SIZE)
+
+
+def _generation(buf) -> int:
+    return int(np.frombuffer(buf, np.int64, 1)[0])
+
+
+class FramePool:
+    """固定数量的共享内存帧缓冲区，按引用计数回收
+    - slots: 缓冲区数量，全部被占用时 acquire 会等待
+    - frame_bytes: 单帧最大字节数
+    """
+
+    def __init__(self, slots: int = 4, frame_bytes: int = DEFAULT_FRAME_BYTES) -> None:
+        self.frame_bytes = frame_bytes
+        self._buffers = [SharedMemory(create=True, size=HEADER_SIZE + frame_bytes) for _ in range(slots)]
+        self._refcounts = [0] * slots
+        self._generations = [0] * slots
+        self._condition = Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def acquire(self, shape: tuple[int, ...], dtype=np.uint8, timeout: Optional[float] = None) -> FrameHandle:
+        """占用一个空闲缓冲区（引用计数为1），之后通过 array 写入数据"""
+        dtype = np.dtype(dtype)
+        shape = tuple(int(i) for i in shape)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.frame_bytes:
+            raise ValueError(f"帧大小 {nbytes} 超过缓冲区大小 {self.frame_bytes}")
+        with self._condition:
+            if not self._condition.wait_for(lambda: 0 in self._refcounts, timeout):
+                raise TimeoutError("没有空闲的帧缓冲区")
+            slot = self._refcounts.index(0)
+            self._refcounts[slot] = 1
+            self._generations[slot] += 1
+            generation = self._generations[slot]
+        buf = self._buffers[slot].buf
+        np.frombuffer(buf, np.int64, 1)[0] = generation
+        return FrameHandle(self._buffers[slot].name, shape, dtype.str, generation, slot)
+
+    def array(self, handle: FrameHandle) -> np.ndarray:
+        """本进程内可写的视图"""
+        buf = self._buffers[handle.slot].buf
+        if _generation(buf) != handle.generation:
+            raise StaleFrameError(repr(handle))
+        return _view(buf, handle)
+
+    def write(self, img: MatLike, timeout: Optional[float] = None) -> FrameHandle:
+        handle = self.acquire(img.shape, img.dtype, timeout)
+        np.copyto(self.array(handle), img)
+        return handle
+
+    def retain(self, handle: FrameHandle):
+        with self._condition:
+            if self._generations[handle.slot] != handle.generation or not self._refcounts[handle.slot]:
+                raise StaleFrameError(repr(handle))
+            self._refcounts[handle.slot] += 1
+
+    def release(self, handle: FrameHandle):
+        """引用计数减一；已被回收的帧忽略，重复释放抛出 StaleFrameError"""
+        with self._condition:
+            if self._generations[handle.slot] != handle.generation:
+                return
+            if not self._refcounts[handle.slot]:
+                raise StaleFrameError(f"重复释放 {handle!r}")
+            self._refcounts[handle.slot] -= 1
+            if not self._refcounts[handle.slot]:
+                self._condition.notify()
+
+    def submit(self, executor: Executor, fn: Callable, handle: FrameHandle, *args, **kwargs) -> Future:
+        """提交任务，任务完成前保持帧不被回收"""
+        self.retain(handle)
+        future = executor.submit(fn, handle, *args, **kwargs)
+        future.add_done_callback(lambda _: self.release(handle))
+        return future
+
+    def close(self):
+        for shm in self._buffers:
+            shm.close()
+            shm.unlink()
+        self._buffers = []
+
+
+_attached: dict[str, SharedMemory] = {}
+
+
+def open_frame(handle: FrameHandle) -> np.ndarray:
+    """在工作进程中打开帧（只读视图），共享内存按名称缓存"""
+    shm = _attached.get(handle.name)
+    if shm is None:
+        shm = _attached[handle.name] = SharedMemory(name=handle.name, track=False)
+    if _generation(shm.buf) != handle.generation:
+        raise StaleFrameError(repr(handle))
+    view = _view(shm.buf, handle)
+    view.flags.writeable = False
+    return view
+
+
+def match_frame(
+    handle: FrameHandle,
+    template: str | MatLike,
+    per: float = 0.9,
+    cutPoints=None,
+    scale: float = 1.0,
+) -> tuple[Optional[list], Optional[list]]:
+    """工作进程中的模板匹配，返回 (四角坐标列表, 中心点列表)"""
+    frame = open_frame(handle)
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    x0, y0 = 0, 0
+    if cutPoints:
+        (x0, y0), (x1, y1) = cutPoints
+        gray = gray[y0:y1, x0:x1]
+    return match_template(gray, template_cache.get(template, scale), per, (x0, y0))
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from os import stat
+from threading import Lock
+from typing import Iterable, Optional, Sequence
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+# 开启缩放搜索时，在估计的缩放比例附近尝试的倍数
+DEFAULT_SEARCH = (0.9, 0.95, 1.0, 1.05, 1.1)
+
+
+def scale_for(size: tuple[int, int], base_size: Optional[tuple[int, int]]) -> float:
+    """模板制作时的分辨率 base_size 到设备分辨率 size 的缩放比例（均为横屏）\n
+    宽高比不同时取较小的比例"""
+    if not base_size:
+        return 1.0
+    return min(size[0] / base_size[0], size[1] / base_size[1])
+
+
+def ceil_position(locations) -> tuple[list, list]:
+    """合并相邻（10像素内）的匹配点"""
+    tmp_y = [locations[0][0]]
+    tmp_x = [locations[1][0]]
+    for y, x in zip(*locations):
+        if x - 10 >= tmp_x[-1]:
+            tmp_x.append(x)
+            tmp_y.append(y)
+            continue
+        if y - 10 >= tmp_y[-1]:
+            tmp_x.append(x)
+            tmp_y.append(y)
+            continue
+    return tmp_y, tmp_x
+
+
+def match_template(
+    screenshot_gray: MatLike,
+    template_gray: MatLike,
+    per: float = 0.9,
+    offset: tuple[int, int] = (0, 0),
+) -> tuple[Optional[list], Optional[list]]:
+    """返回 (四角坐标列表, 中心点列表)，未匹配时均为None"""
+    matcher = cv2.matchTemplate(screenshot_gray, template_gray, cv2.TM_CCOEFF_NORMED)
+    return locate(matcher, template_gray.shape[1::-1], per, offset)
+
+
+def locate(matcher, templete_size: tuple[int, int], per: float, offset: tuple[int, int]):
+    x0, y0 = offset
+    temleteWidth, templeteHeight = templete_size
+    locations = np.where(matcher > per)
+    if not any(locations[0]):
+        return None, None
+    tmp_y, tmp_x = ceil_position(locations)
+    matchTempletePoints = [
+        (
+            (x + x0, y + y0),
+            (x + x0 + temleteWidth, y + y0),
+            (x + x0, y + y0 + templeteHeight),
+            (x + x0 + temleteWidth, y + y0 + templeteHeight),
+        )
+        for x, y in zip(tmp_x, tmp_y)
+    ]
+    matchTempleteCenterPoints = [
+        ((x + temleteWidth // 2) + x0, (y + templeteHeight // 2) + y0)
+        for x, y in zip(tmp_x, tmp_y)
+    ]
+    return matchTempletePoints, matchTempleteCenterPoints
+
+
+class TemplateCache:
+    """模板灰度图及各缩放比例结果的LRU缓存，可在多个设备之间共享\n
+    路径模板以 (路径, mtime) 为键，文件修改后自动重新读取；数组模板以内容摘要为键"""
+
+    def __init__(self, max_items: int = 512) -> None:
+        self.max_items = max_items
+        self._lock = Lock()
+        self._items: OrderedDict[tuple, MatLike] = OrderedDict()
+
+    @staticmethod
+    def key(template: str | MatLike) -> tuple:
+        if isinstance(template, str):
+            return ("path", template, stat(template).st_mtime_ns)
+        if isinstance(template, np.ndarray):
+            digest = blake2b(np.ascontiguousarray(template).data, digest_size=16).digest()
+            return ("array", digest, template.shape, template.dtype.str)
+        raise TypeError("匹配图像类型错误")
+
+    def _get(self, key: tuple) -> Optional[MatLike]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def _put(self, key: tuple, item: MatLike):
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def gray(self, template: str | MatLike, key: tuple = None) -> MatLike:
+        key = key if key else self.key(template)
+        gray = self._get(key + (1.0,))
+        if gray is not None:
+            return gray
+        if isinstance(template, str):
+            try:
+                gray = cv2.imread(template, cv2.IMREAD_GRAYSCALE)
+            except FileNotFoundError:
+                gray = None
+            if gray is None:
+                raise FileNotFoundError(f"模板读取失败 {template}")
+        elif template.ndim == 3:
+            gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = template
+        self._put(key + (1.0,), gray)
+        return gray
+
+    def get(self, template: str | MatLike, scale: float = 1.0) -> MatLike:
+        """指定缩放比例的灰度模板"""
+        key = self.key(template)
+        scale = round(scale, 4)
+        if scale == 1.0:
+            return self.gray(template, key)
+        scaled = self._get(key + (scale,))
+        if scaled is not None:
+            return scaled
+        gray = self.gray(template, key)
+        h, w = gray.shape[:2]
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+        scaled = cv2.resize(gray, size, interpolation=interpolation)
+        self._put(key + (scale,), scaled)
+        return scaled
+
+    def precompute(self, templates: Iterable[str | MatLike], scales: Sequence[float]):
+        """预先生成模板在各缩放比例下的结果"""
+        for template in templates:
+            for scale in scales:
+                self.get(template, scale)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+template_cache = TemplateCache()
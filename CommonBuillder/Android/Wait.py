@@ -0,0 +1,236 @@
+import time
+from concurrent.futures import CancelledError
+from threading import Condition, Event, Lock
+from typing import Any, Optional, Sequence
+from weakref import WeakKeyDictionary, ref
+
+import cv2
+from cv2.typing import MatLike
+
+
+class Text:
+    """等待的文字目标，需要传入OCR
+    - cutPoints: 只识别该区域
+    - exact: 完全一致，否则包含即可
+    """
+
+    def __init__(self, text: str, cutPoints=None, exact: bool = False) -> None:
+        self.text = text
+        self.cutPoints = cutPoints
+        self.exact = exact
+
+    def match(self, texts: list[str]) -> list[str]:
+        if self.exact:
+            return [i for i in texts if i == self.text]
+        return [i for i in texts if self.text in i]
+
+    def __repr__(self) -> str:
+        return f"Text({self.text!r})"
+
+
+class Frame:
+    """started: 开始截图的时间，time: 截图完成的时间（time.monotonic）"""
+
+    __slots__ = ("seq", "started", "time", "img", "gray")
+
+    def __init__(self, seq: int, started: float, time: float, img: MatLike, gray: MatLike) -> None:
+        self.seq = seq
+        self.started = started
+        self.time = time
+        self.img = img
+        self.gray = gray
+
+
+class SharedCapture:
+    """同一设备上的等待共享截图：max_age 内的截图直接复用，
+    正在截图时其他等待者等待同一结果，而不是各自再截一次\n
+    只保存设备的弱引用，设备被释放后对应的 SharedCapture 也会被释放"""
+
+    def __init__(self, device) -> None:
+        self._device = ref(device)
+        self._condition = Condition()
+        self._capturing = False
+        self._latest: Optional[Frame] = None
+        self._seq = 0
+
+    @property
+    def device(self):
+        device = self._device()
+        if device is None:
+            raise ReferenceError("设备已被释放")
+        return device
+
+    def get(
+        self,
+        max_age: float = 0.0,
+        after: float = 0.0,
+        deadline: Optional[float] = None,
+        cancel: Optional[Event] = None,
+        step: float = 0.05,
+    ) -> Frame:
+        """after: 只使用在该时间（time.monotonic，例如最近一次输入）之后开始的截图\n
+        等待其他等待者的截图时，超过 deadline 抛出 TimeoutError，cancel 被设置时抛出 CancelledError"""
+        with self._condition:
+            while True:
+                latest = self._latest
+                if latest and latest.started > after and time.monotonic() - latest.time <= max_age:
+                    return latest
+                if not self._capturing:
+                    break
+                seq = self._seq
+                self._wait(lambda: not self._capturing or self._seq != seq, deadline, cancel, step)
+                if self._seq != seq and self._latest.started > after:
+                    return self._latest
+            self._capturing = True
+        started = time.monotonic()
+        try:
+            img = self.device.screenshot()
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            with self._condition:
+                self._seq += 1
+                self._latest = Frame(self._seq, started, time.monotonic(), img, gray)
+                return self._latest
+        finally:
+            with self._condition:
+                self._capturing = False
+                self._condition.notify_all()
+
+    def _wait(self, predicate, deadline: Optional[float], cancel: Optional[Event], step: float):
+        while not predicate():
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("等待截图超时")
+            if cancel is not None:
+                remaining = step if remaining is None else min(remaining, step)
+            self._condition.wait(remaining)
+
+
+_captures: "WeakKeyDictionary[Any, SharedCapture]" = WeakKeyDictionary()
+_captures_lock = Lock()
+
+
+def shared_capture(device) -> SharedCapture:
+    with _captures_lock:
+        capture = _captures.get(device)
+        if capture is None:
+            capture = _captures[device] = SharedCapture(device)
+        return capture
+
+
+_inputs: "WeakKeyDictionary[Any, Condition]" = WeakKeyDictionary()
+
+
+def _input_condition(device) -> Condition:
+    with _captures_lock:
+        condition = _inputs.get(device)
+        if condition is None:
+            condition = _inputs[device] = Condition()
+        return condition
+
+
+def notify_input(device):
+    """记录设备的输入时间并唤醒正在等待的 wait_any，使其立即重新检查"""
+    condition = _input_condition(device)
+    with condition:
+        device.last_input = time.monotonic()
+        condition.notify_all()
+
+
+def _sleep(device, last_input: float, timeout: float, cancel: Optional[Event], step: float):
+    """等待 timeout 秒，设备有新的输入或 cancel 被设置时提前返回"""
+    condition = _input_condition(device)
+    changed = lambda: getattr(device, "last_input", 0.0) != last_input
+    end = time.monotonic() + timeout
+    with condition:
+        while not changed():
+            if cancel is not None and cancel.is_set():
+                return
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            # 有cancel时分段等待，以便及时响应取消
+            condition.wait(min(remaining, step) if cancel is not None else remaining)
+
+
+def _describe(target) -> str:
+    """超时信息中的目标描述，ndarray 只给出形状而不是像素"""
+    if isinstance(target, (Text, str)):
+        return repr(target)
+    shape = getattr(target, "shape", None)
+    if shape is not None:
+        return f"{type(target).__name__}{tuple(shape)}"
+    return type(target).__name__
+
+
+def _check(device, target, frame: Frame, per: float, ocr):
+    """命中时返回匹配信息（模板）或匹配的文字列表（Text），否则返回None"""
+    if isinstance(target, Text):
+        if ocr is None:
+            raise ValueError("等待文字需要传入OCR")
+        img = device.cutScreenshot(frame.img, target.cutPoints)
+        texts = target.match(ocr.readtext(img))
+        return texts if texts else None
+    detail = device.findImageDetail(target, per=per, grayScreenshot=frame.gray)
+    return detail if detail.matched else None
+
+
+def wait_any(
+    device,
+    targets: Sequence,
+    timeout: float = 10.0,
+    per: float = 0.9,
+    ocr=None,
+    cancel: Optional[Event] = None,
+    min_interval: float = 0.05,
+    max_interval: float = 1.0,
+    backoff: float = 1.5,
+    gone: bool = False,
+) -> tuple[int, Any]:
+    """等待任一目标出现，返回 (目标索引, 匹配结果)
+    - gone: 等待任一目标消失，匹配结果为None
+    - 轮询间隔从 min_interval 按 backoff 增长到 max_interval；
+      设备有输入（click）时立即唤醒并重置间隔，且不再使用输入之前的截图
+    - 超时抛出 TimeoutError，cancel 被设置时抛出 CancelledError
+    """
+    capture = shared_capture(device)
+    deadline = time.monotonic() + timeout
+    interval = min_interval
+    last_input = getattr(device, "last_input", 0.0)
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise CancelledError()
+        try:
+            frame = capture.get(min_interval, last_input, deadline, cancel, min_interval)
+        except TimeoutError:
+            raise TimeoutError(f"等待超时 {[_describe(i) for i in targets]}") from None
+        for index, target in enumerate(targets):
+            result = _check(device, target, frame, per, ocr)
+            if gone and result is None:
+                return index, None
+            if not gone and result is not None:
+                return index, result
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"等待超时 {[_describe(i) for i in targets]}")
+        _sleep(device, last_input, min(interval, remaining), cancel, min_interval)
+
+        current_input = getattr(device, "last_input", 0.0)
+        if current_input != last_input:
+            last_input = current_input
+            interval = min_interval
+        else:
+            interval = min(interval * backoff, max_interval)
+
+
+def wait_for(device, target, timeout: float = 10.0, **kwargs):
+    """等待目标出现，返回匹配结果，参数见 wait_any"""
+    return wait_any(device, [target], timeout, **kwargs)[1]
+
+
+def wait_gone(device, target, timeout: float = 10.0, **kwargs) -> bool:
+    """等待目标消失，参数见 wait_any"""
+    wait_any(device, [target], timeout, gone=True, **kwargs)
+    return True
@@ -0,0 +1,207 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from json import dumps, load
+from os import link, sep
+from os.path import abspath, dirname, exists, getsize, isfile, join, relpath, splitext
+from threading import Lock
+from typing import Iterable
+
+from .File import FileManage
+
+if find_spec("fcntl"):
+    import fcntl
+else:
+    fcntl = None
+
+# linux ioctl FICLONE
+FICLONE = 0x40049409
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str, algorithm: str = "sha256", chunk_size: int = CHUNK_SIZE) -> str:
+    """分块计算文件摘要，不整体读入内存"""
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as fp:
+        while size := fp.readinto(buffer):
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+def hash_files(paths: Iterable[str], algorithm: str = "sha256", workers: int = 4) -> dict[str, str]:
+    """并行计算多个文件的摘要（hashlib在大块数据上会释放GIL）"""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = executor.map(lambda p: hash_file(p, algorithm), paths)
+        return dict(zip(paths, digests))
+
+
+def reflink(src: str, dst: str) -> bool:
+    """写时复制的克隆（btrfs/xfs等），不支持时返回False"""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as sp, open(dst, "wb") as dp:
+            fcntl.ioctl(dp.fileno(), FICLONE, sp.fileno())
+        return True
+    except OSError:
+        FileManage.rm(dst)
+        return False
+
+
+def link_file(src: str, dst: str, hardlink: bool = True) -> str:
+    """依次尝试 reflink、硬链接、复制，返回使用的方式"""
+    if reflink(src, dst):
+        return "reflink"
+    if hardlink:
+        try:
+            link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    FileManage.cp(src, dst)
+    return "copy"
+
+
+class AssetStore:
+    """按内容摘要存储的资源库（模板、截图、下载文件）\n
+    objects/<ab>/<digest><ext> 保存内容，manifest.json 保存 名称->摘要 的索引\n
+    mode:
+    - copy（默认）: reflink > 复制，之后修改源文件不影响已存储的对象
+    - link: reflink > 硬链接 > 复制。硬链接与源文件共享数据，源文件原地修改会改变已存储的对象
+    - move: 同一文件系统内直接重命名
+    """
+
+    MANIFEST = "manifest.json"
+    MODES = ("copy", "link", "move")
+
+    def __init__(self, root: str, algorithm: str = "sha256") -> None:
+        self.root = root
+        self.algorithm = algorithm
+        self.objects_path = join(root, "objects")
+        self.manifest_path = join(root, self.MANIFEST)
+        FileManage.makedirs(self.objects_path)
+        self._lock = Lock()
+        self.names: dict[str, str] = {}
+        self.objects: dict[str, dict] = {}
+        if isfile(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as fp:
+                manifest = load(fp)
+            self.names = manifest["names"]
+            self.objects = manifest["objects"]
+
+    def object_path(self, digest: str) -> str:
+        ext = self.objects[digest]["ext"]
+        return join(self.objects_path, digest[:2], digest + ext)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def digest(self, name: str) -> str | None:
+        return self.names.get(name)
+
+    def get(self, name: str) -> str | None:
+        """名称对应的对象路径"""
+        digest = self.names.get(name)
+        return self.object_path(digest) if digest else None
+
+    def add(self, path: str, name: str = None, mode: str = "copy", digest: str = None) -> str:
+        """添加文件，内容已存在时只记录名称，返回摘要"""
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的模式 {mode}")
+        name = name if name else FileManage(path).file_name
+        digest = digest if digest else hash_file(path, self.algorithm)
+        with self._lock:
+            info = self.objects.get(digest) or {"size": getsize(path), "ext": splitext(path)[-1]}
+        dst = join(self.objects_path, digest[:2], digest + info["ext"])
+        if not exists(dst):
+            try:
+                self._place(path, dst, mode)
+            except BaseException:
+                # 移动失败时源文件仍在，删除不完整的对象
+                if exists(path):
+                    FileManage.rm(dst)
+                raise
+        elif mode == "move":
+            FileManage.rm(path)
+        with self._lock:
+            self.objects.setdefault(digest, info)
+            self.names[name] = digest
+        return digest
+
+    def add_many(
+        self, paths: Iterable[str] | dict[str, str], mode: str = "copy", workers: int = 4, root: str = None
+    ) -> dict[str, str]:
+        """并行计算摘要后批量添加，返回 名称->摘要
+        - paths: 路径列表，或 名称->路径
+        - root: 名称为相对 root 的路径（以/分隔），否则为文件名
+        同名但内容不同时抛出ValueError，此时不会添加任何文件
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的模式 {mode}")
+        if isinstance(paths, dict):
+            named = list(paths.items())
+        elif root:
+            named = [(relpath(path, root).replace(sep, "/"), path) for path in paths]
+        else:
+            named = [(FileManage(path).file_name, path) for path in paths]
+        digests = hash_files({path for _, path in named}, self.algorithm, workers)
+
+        ans = {}
+        for name, path in named:
+            if name in ans and ans[name] != digests[path]:
+                raise ValueError(f"名称重复且内容不同: {name}")
+            ans[name] = digests[path]
+        for name, path in named:
+            self.add(path, name, mode, digests[path])
+        self.save()
+        return ans
+
+    def _place(self, src: str, dst: str, mode: str):
+        FileManage.makedirs(dirname(dst))
+        match mode:
+            case "move":
+                FileManage.nr_mv(src, dst)
+            case "link":
+                link_file(src, dst, hardlink=True)
+            case "copy":
+                link_file(src, dst, hardlink=False)
+
+    def export(self, name: str, dst: str, hardlink: bool = False) -> str:
+        """将资源放到指定路径，返回使用的方式\n
+        hardlink 为True时允许硬链接，此时不能原地修改导出的文件"""
+        src = self.get(name)
+        if src is None:
+            raise KeyError(name)
+        FileManage.makedirs(dirname(abspath(dst)))
+        if exists(dst):
+            FileManage.rm(dst)
+        return link_file(src, dst, hardlink)
+
+    def remove(self, name: str):
+        self.names.pop(name, None)
+
+    def gc(self) -> int:
+        """删除没有名称引用的对象，返回删除数量"""
+        used = set(self.names.values())
+        unused = [i for i in self.objects.keys() if i not in used]
+        for digest in unused:
+            FileManage.rm(self.object_path(digest))
+            del self.objects[digest]
+        return len(unused)
+
+    def save(self):
+        """原子写入manifest"""
+        with self._lock:
+            content = dumps(
+                {"names": self.names, "objects": self.objects},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        with FileManage.atomic_open(self.manifest_path) as fp:
+            fp.write(content)
@@ -2,56 +2,111 @@ from abc import abstractmethod
 import re
 
 from typing import Type
-from weakref import WeakKeyDictionary
 from importlib.util import find_spec
 
 
+_ILLEGAL_NAME = re.compile(r"\W")
+_DIGIT_HEAD = re.compile(r"\d")
+_HAS_RICH = find_spec("rich") is not None
+# Const 的内部槽，只能在类内部通过 object.__setattr__ 修改
+_INTERNAL_SLOTS = frozenset(("__dict__", "__weakref__", "_frozen", "_iterator"))
+
+
+class ConstIterator:
+    """常量名迭代器，创建时固定常量名列表"""
+
+    __slots__ = ("_keys", "_empty")
+
+    def __init__(self, const: "Const"):
+        keys = list(const.__dict__)
+        self._empty = not keys
+        self._keys = iter(keys)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._empty:
+            raise Const.ConstError("还没有常量存储")
+        return next(self._keys)
+
+
 class Const:
-    _instances_const = WeakKeyDictionary()
-    _instances_index = WeakKeyDictionary()
+    """常量存储在实例 __dict__ 中，读取不经过 __getattr__\n
+    常量不能修改或删除，freeze() 后不能再添加新常量"""
+
+    __slots__ = ("__dict__", "__weakref__", "_frozen", "_iterator")
 
     class ConstError(TypeError):
         pass
 
     def __init__(self):
-        Const._instances_const[self] = {}
-        Const._instances_index[self] = 0
+        object.__setattr__(self, "_frozen", False)
+        object.__setattr__(self, "_iterator", None)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._init_attrs()
+
+    @classmethod
+    def _init_attrs(cls):
+        """缓存类属性名，写入时无需每次调用 __dir__"""
+        cls._attrs = frozenset(dir(cls)) | {"_attrs", "_settable_attrs"}
+        cls._settable_attrs = frozenset(
+            i
+            for i in cls._attrs
+            if i not in _INTERNAL_SLOTS and hasattr(getattr(cls, i, None), "__set__")
+        )
 
     @property
     def __const__(self) -> dict:
-        return Const._instances_const[self]
+        return self.__dict__
 
     @property
-    def __index__(self) -> int:
-        return Const._instances_index[self]
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self):
+        """冻结常量表"""
+        object.__setattr__(self, "_frozen", True)
+        return self
 
     def items(self):
-        return self.__const__.items()
+        return self.__dict__.items()
 
     def keys(self):
-        return self.__const__.keys()
+        return self.__dict__.keys()
 
     def values(self):
-        return self.__const__.values()
+        return self.__dict__.values()
 
     def toDict(self):
-        return self.__const__
+        return self.__dict__
 
     def __setattr__(self, name, value):
-        if name in self.__const__:
+        if name in self.__dict__:
             raise self.ConstError("不能改变常量")
-        if name not in self.__dir__():
-            self.__const__[name] = value
+        if name in self._settable_attrs:
+            object.__setattr__(self, name, value)
+        elif name in self._attrs:
+            raise self.ConstError("常量名与属性冲突")
+        elif self._frozen:
+            raise self.ConstError("常量表已冻结")
         else:
-            super().__setattr__(name, value)
+            self.__dict__[name] = value
+
+    def __delattr__(self, name):
+        if name in self.__dict__:
+            raise self.ConstError("不能删除常量")
+        if name in _INTERNAL_SLOTS:
+            raise self.ConstError("不能删除内部属性")
+        object.__delattr__(self, name)
 
     def __getattr__(self, name: str):
-        if name in self.__const__:
-            return self.__const__[name]
         raise self.ConstError("找不到常量")
 
     def __setitem__(self, name: str, value):
-        if re.search(r"\W", name) or re.match(r"\d", name):
+        if _ILLEGAL_NAME.search(name) or _DIGIT_HEAD.match(name):
             raise self.ConstError("非法的常量名")
         if name.isdigit():
             raise self.ConstError("常量名不能是数字")
@@ -59,28 +114,35 @@ class Const:
             self.__setattr__(name, value)
 
     def __getitem__(self, name):
-        return self.__getattr__(name)
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise self.ConstError("找不到常量") from None
+
+    def __contains__(self, name) -> bool:
+        return name in self.__dict__
 
     def __iter__(self):
-        return self
+        return ConstIterator(self)
 
     def __next__(self):
-        if len(self.__const__):
-            values = list(self.keys())
-            self.__index__ += 1
-            if self.__index__ > len(values):
-                self.__index__ = 0
-                raise StopIteration
-            ans = values[self.__index__ - 1]
-            return ans
-        else:
-            raise self.ConstError("还没有常量存储")
+        if self._iterator is None:
+            object.__setattr__(self, "_iterator", ConstIterator(self))
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            object.__setattr__(self, "_iterator", None)
+            raise
 
     def __rich__(self):
-        if find_spec("rich"):
+        if _HAS_RICH:
             return self.toDict()
         return None
 
+
+Const._init_attrs()
+
+
 class Data:
     def __set_name__(self, owner, name):
         self.name = f"{owner.__name__}.{name}"
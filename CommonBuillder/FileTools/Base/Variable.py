@@ -1,11 +1,17 @@
-from Define import Const
+from .Define import Const
 
 
 class Variable(Const):
+    """可修改的常量表，已有的变量可以重新赋值，也可以用 del 删除"""
+
     def __setattr__(self, name, value):
-        if name in self.__const__:
-            self.__const__[name] = value
-        if name not in self.__dir__():
-            self.__const__[name] = value
+        if name in self.__dict__:
+            self.__dict__[name] = value
         else:
             super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if name in self.__dict__:
+            del self.__dict__[name]
+        else:
+            super().__delattr__(name)
@@ -1,11 +1,13 @@
 import re
 from abc import abstractmethod
 from copy import deepcopy
-from json import dumps, load
+from json import dumps, load, loads
 from os.path import isfile
 from typing import Any, Iterator, Union, Type, TypeVar
 
+from .Entity import compile_entity
 from .File import FileManage
+from .Snapshot import dump_snapshot, load_snapshot, source_digest
 
 DEFAULT_SECTION = "default"
 
@@ -46,9 +48,15 @@ class IniConfig:
     """
 
     def __init__(
-        self, path: str = None, prefix: str = "", chain: str = "=", other: str = ""
+        self,
+        path: str = None,
+        prefix: str = "",
+        chain: str = "=",
+        other: str = "",
+        snapshot: bool = False,
     ) -> None:
         self.path = path
+        self.snapshot = snapshot
         self._configs: dict[str, dict[str, Entry]] = {}
         self._index_to_location: dict[int, dict[str, str]] = {}
         if path:
@@ -98,9 +106,49 @@ class IniConfig:
         self._fistword_jumpstrs = ["\n", ";"]
 
     def init_configs(self):
-        """初始化，获取文件配置内容"""
+        """初始化，获取文件配置内容\n
+        开启snapshot时优先读取源文件摘要一致的二进制快照，否则解析后保存快照"""
         self.init_config_rule()
+        if not self.snapshot:
+            self.parse_configs()
+            return
+
+        kind = type(self).__name__
+        digest = source_digest(self.path)
+        if (state := load_snapshot(self.path, kind, digest)) is not None:
+            self.load_state(state)
+            return
+        self.parse_configs()
+        try:
+            dump_snapshot(self.path, kind, self.dump_state(), digest)
+        except OSError:
+            # 目录只读或空间不足时只是不缓存，解析结果仍可用
+            pass
+
+    def dump_state(self) -> tuple:
+        """解析结果转换为可序列化的结构"""
+        return tuple(
+            (
+                sec,
+                tuple(
+                    (e.conf, e.value, e.index, e.chain, e.prefix, e.other)
+                    for e in options.values()
+                ),
+            )
+            for sec, options in self._configs.items()
+        )
 
+    def load_state(self, state: tuple):
+        """从dump_state的结构恢复解析结果"""
+        for sec, options in state:
+            section = self._configs[sec] = {}
+            for option, value, index, chain, prefix, other in options:
+                section[option] = Entry(option, value, index, chain, prefix, other)
+                if index >= 0:
+                    self._index_to_location[index] = [sec, option]
+
+    def parse_configs(self):
+        """逐行正则解析文件"""
         section_name = DEFAULT_SECTION
         with open(self.path, "r", encoding="utf-8") as fp:
             for index, line in enumerate(fp.readlines()):
@@ -196,29 +244,20 @@ class IniConfig:
         return self._index_to_location[index]
 
     def trans_entity_dict(self, cls: Type[T]) -> dict[str, T]:
-        """转换为指定类型"""
-        ans = {}
-        for sec, options in self._configs.items():
-            entity = cls()
-            for opt, entry in options.items():
-                if opt in entity.__dict__.keys():
-                    entity.__setattr__(opt, entry.value)
-            ans[sec] = entity
-        return ans
-    
+        """转换为指定类型，按类型注解转换值（int/float/bool/list）"""
+        plan = compile_entity(cls)
+        return {
+            sec: plan.build((opt, entry.value) for opt, entry in options.items())
+            for sec, options in self._configs.items()
+        }
+
     @staticmethod
     def trans_entity(cls: Type[T], entrys: list[Entry] | dict[str, str]) -> T:
-        entity = cls()
+        plan = compile_entity(cls)
         if isinstance(entrys, dict):
-            for key, value in entrys.items():
-                if key in cls.__dict__.keys():
-                    entity.__setattr__(key, value)
-            return entity
+            return plan.build(entrys.items())
         if isinstance(entrys, list):
-            for entry in entrys:
-                if entry.conf in cls.__dict__.keys():
-                    entity.__setattr__(entry.conf, entry.value)
-            return entity
+            return plan.build((entry.conf, entry.value) for entry in entrys)
 
 class CfgConfig(IniConfig):
     """
@@ -229,9 +268,14 @@ class CfgConfig(IniConfig):
     }
     """
     def __init__(
-        self, path: str = None, prefix: str = "", chain: str = "=", other: str = ""
+        self,
+        path: str = None,
+        prefix: str = "",
+        chain: str = "=",
+        other: str = "",
+        snapshot: bool = False,
     ) -> None:
-        super().__init__(path, prefix, chain, other)
+        super().__init__(path, prefix, chain, other, snapshot)
 
     def init_config_rule(self):
         self._section_rule = r"(?P<section>.*[^\s])\s*\{"
@@ -247,9 +291,14 @@ class TxtConfig(IniConfig):
     option: value
     """
     def __init__(
-        self, path: str = None, prefix: str = "", chain: str = ":", other: str = ""
+        self,
+        path: str = None,
+        prefix: str = "",
+        chain: str = ":",
+        other: str = "",
+        snapshot: bool = False,
     ) -> None:
-        super().__init__(path, prefix, chain, other)
+        super().__init__(path, prefix, chain, other, snapshot)
 
     def init_config_rule(self):
         self._section_rule = r"^\[(?P<section>.*[^\s])\]$"
@@ -258,36 +307,147 @@ class TxtConfig(IniConfig):
 
 
 class JsonConfig:
-    def __init__(self, path) -> None:
+    """json配置文件，首次访问时才读取文件
+    - compact: 以紧凑格式保存（无缩进），序列化与写入更快
+    - journal: 追加模式，set_config 立即以 JSON Lines 追加到 `<path>.jsonl`，
+      读取时回放，save 时合并进主文件并清空
+    - 只有 set_config 会标记为已修改；直接修改 get_config 返回的 dict/list 后需调用 mark_dirty，
+      否则 save 不会写入
+    - mutable_reads: get_config 返回 dict/list 时即视为已修改，适合习惯直接修改返回值的调用者，
+      代价是每次 save 都会完整写入
+    """
+
+    def __init__(self, path, compact: bool = False, journal: bool = False, mutable_reads: bool = False) -> None:
         self.path = path
-        self._configs: dict = load(open(self.path))
+        self.compact = compact
+        self.journal = journal
+        self.mutable_reads = mutable_reads
+        self.journal_path = f"{path}.jsonl"
+        self._data = None
+        self._parents: dict[tuple, Any] = {}
+        self._dirty = False
+        self._journal_fp = None
+
+    @property
+    def _configs(self) -> dict:
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self):
+        """标记为已修改，下次 save 时写入"""
+        self._parents.clear()
+        self._dirty = True
+
+    def _load(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as fp:
+            data = load(fp)
+        if isfile(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as fp:
+                for line in fp:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        # 最后一行可能写入中断
+                        break
+                    parent = self._walk(data, self._key(record["sec"]))
+                    parent[record["opt"]] = record["value"]
+                    self._dirty = True
+        return data
+
+    @staticmethod
+    def _key(sec: str | tuple | list) -> tuple:
+        return (sec,) if isinstance(sec, str) else tuple(sec)
+
+    @staticmethod
+    def _walk(tmp, keys: tuple):
+        for key in keys:
+            tmp = tmp[key]
+        return tmp
+
+    def _lookup(self, keys: tuple):
+        """通过缓存的父容器查找路径"""
+        if not keys:
+            return self._configs
+        parent_keys = keys[:-1]
+        parent = self._parents.get(parent_keys)
+        if parent is None:
+            parent = self._walk(self._configs, parent_keys)
+            self._parents[parent_keys] = parent
+        return parent[keys[-1]]
+
+    def _invalidate(self, keys: tuple):
+        size = len(keys)
+        for cached in [i for i in self._parents.keys() if i[:size] == keys]:
+            del self._parents[cached]
 
     def set_config(self, sec: str | tuple, opt: str, value: Any):
         """设置配置项"""
-        option = self.get_config(sec)
+        keys = self._key(sec)
+        option = self._lookup(keys)
         option[opt] = value
+        self._invalidate(keys + (opt,))
+        self._dirty = True
+        if self.journal:
+            self._append(keys, opt, value)
+
+    def _append(self, keys: tuple, opt: str, value: Any):
+        if self._journal_fp is None:
+            self._journal_fp = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_fp.write(
+            dumps({"sec": keys, "opt": opt, "value": value}, separators=(",", ":")) + "\n"
+        )
+        self._journal_fp.flush()
 
     def save(self):
-        with open(self.path, "w", encoding="utf-8") as fp:
-            fp.write(dumps(self._configs, indent=4))
+        """原子写入，未修改（见 dirty）时不写入"""
+        if self._data is None or not self._dirty:
+            return
+        if self.compact:
+            content = dumps(self._data, separators=(",", ":"))
+        else:
+            content = dumps(self._data, indent=4)
+        with FileManage.atomic_open(self.path, sync=True) as fp:
+            fp.write(content)
+        self.close()
+        FileManage.rm(self.journal_path)
+        self._dirty = False
+
+    def close(self):
+        if self._journal_fp is not None:
+            self._journal_fp.close()
+            self._journal_fp = None
 
     def get_config(self, sec: str | tuple) -> Any:
         """获取配置项值"""
         if isinstance(sec, str):
-            return self._configs[sec]
+            value = self._configs[sec]
         elif isinstance(sec, tuple):
-            tmp = self._configs
-            for key in sec:
-                tmp = tmp[key]
-            return tmp
+            value = self._lookup(sec)
+        else:
+            return None
+        if self.mutable_reads and isinstance(value, (dict, list)):
+            # 返回的容器可能被直接修改，其下缓存的父容器可能失效
+            self._invalidate(self._key(sec))
+            self._dirty = True
+        return value
 
 
 class Config:
-    """ini或者cfg的配置文件读取与修改"""
+    """ini或者cfg的配置文件读取与修改
+    - snapshot: ini/cfg/txt 解析结果缓存为二进制快照（`<path>.snap`）
+    """
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, snapshot: bool = False) -> None:
         if isfile(path):
             self.path = path
+            self.snapshot = snapshot
             self.file_type = FileManage(path=self.path).file_type
         else:
             raise ValueError("文件路径错误")
@@ -308,11 +468,11 @@ class Config:
     def Config(self):
         match self.file_type:
             case "ini":
-                return IniConfig(self.path)
+                return IniConfig(self.path, snapshot=self.snapshot)
             case "cfg":
-                return CfgConfig(self.path)
+                return CfgConfig(self.path, snapshot=self.snapshot)
             case "txt":
-                return TxtConfig(self.path)
+                return TxtConfig(self.path, snapshot=self.snapshot)
             case "json":
                 return JsonConfig(self.path)
             case _:
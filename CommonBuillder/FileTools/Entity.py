@@ -0,0 +1,140 @@
+from dataclasses import fields, is_dataclass
+from threading import Lock
+from types import NoneType, UnionType
+from typing import Any, Callable, Iterable, Type, TypeVar, Union, get_args, get_origin, get_type_hints
+
+T = TypeVar("T")
+
+_TRUE_STRS = frozenset(["true", "1", "yes", "on", "y"])
+_FALSE_STRS = frozenset(["false", "0", "no", "off", "n", ""])
+
+
+def to_bool(value) -> bool:
+    """配置值转换为bool，支持 true/false yes/no on/off 1/0"""
+    if isinstance(value, bool):
+        return value
+    tmp = str(value).strip().lower()
+    if tmp in _TRUE_STRS:
+        return True
+    if tmp in _FALSE_STRS:
+        return False
+    raise ValueError(f"无法转换为bool: {value}")
+
+
+def to_list(item_converter: Callable = None, container: Callable = list) -> Callable:
+    """配置值转换为列表，字符串以逗号分隔"""
+
+    def converter(value):
+        if isinstance(value, (list, tuple, set)):
+            items = value
+        else:
+            items = [i.strip() for i in str(value).split(",") if i.strip()]
+        if item_converter:
+            return container(item_converter(i) for i in items)
+        return container(items)
+
+    return converter
+
+
+def resolve_converter(tp) -> Callable | None:
+    """根据类型注解获取转换函数，None表示保持原值"""
+    if tp is Any or tp is str or tp is None:
+        return None
+    origin = get_origin(tp)
+    if origin is Union or origin is UnionType:
+        args = [i for i in get_args(tp) if i is not NoneType]
+        return resolve_converter(args[0]) if len(args) == 1 else None
+    if origin in (list, tuple, set, frozenset):
+        args = get_args(tp)
+        item = resolve_converter(args[0]) if args and args[0] is not Ellipsis else None
+        return to_list(item, origin)
+    if tp in (list, tuple, set, frozenset):
+        return to_list(None, tp)
+    if tp is bool:
+        return to_bool
+    if isinstance(tp, type):
+        return tp
+    return None
+
+
+class EntityPlan:
+    """实体类的映射计划，每个类只编译一次\n
+    支持dataclass、带类型注解的类以及普通类（属性保持字符串）"""
+
+    def __init__(self, cls: Type[T]) -> None:
+        self.cls = cls
+        try:
+            hints = get_type_hints(cls)
+        except Exception:
+            hints = dict(getattr(cls, "__annotations__", {}))
+        self.is_dataclass = is_dataclass(cls)
+        if self.is_dataclass:
+            self.init_names = frozenset(i.name for i in fields(cls) if i.init)
+            names = [i.name for i in fields(cls)]
+            self.fast_update = False
+        else:
+            self.init_names = frozenset()
+            probe = cls()
+            names = list(hints.keys())
+            names.extend(i for i in getattr(probe, "__dict__", {}).keys() if i not in hints)
+            names.extend(
+                i
+                for i, v in cls.__dict__.items()
+                if not i.startswith("_") and not callable(v) and i not in names
+                and not isinstance(v, (property, classmethod, staticmethod))
+            )
+            self.fast_update = (
+                hasattr(probe, "__dict__")
+                and type(probe).__setattr__ is object.__setattr__
+                and not any(hasattr(getattr(cls, i, None), "__set__") for i in names)
+            )
+        self.converters: dict[str, Callable | None] = {
+            name: resolve_converter(hints.get(name)) for name in names
+        }
+
+    def convert(self, name: str, value):
+        converter = self.converters[name]
+        if converter is None:
+            return value
+        try:
+            return converter(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"配置项 {name} 类型转换失败: {value}") from e
+
+    def build(self, pairs: Iterable[tuple[str, Any]]) -> T:
+        """按计划批量转换并生成实体"""
+        converters = self.converters
+        values = {}
+        for name, value in pairs:
+            if name in converters:
+                values[name] = self.convert(name, value)
+
+        if self.is_dataclass:
+            entity = self.cls(**{k: v for k, v in values.items() if k in self.init_names})
+            for name, value in values.items():
+                if name not in self.init_names:
+                    object.__setattr__(entity, name, value)
+            return entity
+
+        entity = self.cls()
+        if self.fast_update:
+            entity.__dict__.update(values)
+        else:
+            for name, value in values.items():
+                setattr(entity, name, value)
+        return entity
+
+
+_plans: dict[type, EntityPlan] = {}
+_plans_lock = Lock()
+
+
+def compile_entity(cls: Type[T]) -> EntityPlan:
+    """获取（或编译）类的映射计划"""
+    plan = _plans.get(cls)
+    if plan is None:
+        with _plans_lock:
+            plan = _plans.get(cls)
+            if plan is None:
+                plan = _plans[cls] = EntityPlan(cls)
+    return plan
@@ -1,14 +1,23 @@
-from os.path import join, exists, splitext, dirname, basename, isdir, isfile, relpath
+from os.path import join, exists, splitext, dirname, basename, isdir, isfile, relpath, abspath
 from os.path import split as split_path
-from os import getcwd, makedirs, unlink, rename, listdir, walk
+from os import DirEntry, chmod, fdopen, fstat, fsync, getcwd, makedirs, unlink, rename, replace, scandir, umask
 from zipfile import ZipFile
-from typing import Callable
+from contextlib import contextmanager
+from tempfile import mkstemp
+from mmap import mmap, ACCESS_READ
+from typing import Callable, Iterator
 
 import shutil
 import re
 
 import requests
 
+from .Scan import IndexedEntry, Scanner, compile_filter
+
+# 当前进程的umask，atomic_open 新建文件时与 open() 的权限一致
+_UMASK = umask(0o022)
+umask(_UMASK)
+
 
 class FileManage:
     def __init__(self, path: str = None) -> None:
@@ -53,6 +62,13 @@ class FileManage:
         """not root move"""
         if not exists(new_path):
             shutil.move(old_path, new_path)
+        elif isfile(old_path) and isfile(new_path):
+            try:
+                # 同一文件系统内直接覆盖，避免复制后删除
+                replace(old_path, new_path)
+            except OSError:
+                FileManage.cp(old_path, new_path)
+                FileManage.rm(old_path)
         else:
             FileManage.cp(old_path, new_path)
             FileManage.rm(old_path)
@@ -83,6 +99,33 @@ class FileManage:
         if isfile(path):
             unlink(path)
 
+    @staticmethod
+    @contextmanager
+    def atomic_open(file_path: str, mode: str = "w", encoding: str = None, sync: bool = False):
+        """写入同目录下的临时文件，成功后替换目标文件，失败时删除临时文件
+        >>> with FileManage.atomic_open(path) as fp: fp.write(content)
+        - sync: 替换前 fsync，断电后也不会得到空文件
+        - 保留目标文件原有的权限，新文件的权限与 open() 创建时相同
+        """
+        if encoding is None and "b" not in mode:
+            encoding = "utf-8"
+        fd, tmp_path = mkstemp(prefix=".", suffix=".tmp", dir=dirname(abspath(file_path)))
+        try:
+            # mkstemp 创建的文件权限为0600
+            if exists(file_path):
+                shutil.copymode(file_path, tmp_path)
+            else:
+                chmod(tmp_path, 0o666 & ~_UMASK)
+            with fdopen(fd, mode, encoding=encoding) as fp:
+                yield fp
+                if sync:
+                    fp.flush()
+                    fsync(fp.fileno())
+            replace(tmp_path, file_path)
+        except BaseException:
+            FileManage.rm(tmp_path)
+            raise
+
     @staticmethod
     def touch(file_path: str, content=None):
         wp = FileManage(file_path).save_path
@@ -93,29 +136,103 @@ class FileManage:
                 fp.write(content)
 
     @staticmethod
-    def len_lines(file_path: str) -> int:
-        return len(open(file_path, "r", encoding="utf-8").readlines())
+    def len_lines(file_path: str, chunk_size: int = 1 << 20) -> int:
+        """行数，与 readlines 一致（\\n \\r\\n \\r 均为换行），分块读取，内存占用固定"""
+        lines = 0
+        last = b""
+        with open(file_path, "rb") as fp:
+            while chunk := fp.read(chunk_size):
+                lines += chunk.count(b"\n")
+                # 大多数文件没有单独的 \r，in 比 count 快得多
+                if b"\r" in chunk:
+                    lines += chunk.count(b"\r") - chunk.count(b"\r\n")
+                if last == b"\r" and chunk[:1] == b"\n":
+                    # 上一块末尾的 \r 与这一块开头的 \n 是同一个换行
+                    lines -= 1
+                last = chunk[-1:]
+        if last and last not in (b"\n", b"\r"):
+            lines += 1
+        return lines
 
     @staticmethod
-    def tmp_config(file_path, *, value_regex, value_type: Callable = lambda x: x):
-        """简单的config实现"""
+    def tmp_config(
+        file_path,
+        *,
+        value_regex,
+        value_type: Callable = lambda x: x,
+        use_mmap: bool = False,
+        errors: str = "strict",
+    ):
+        """简单的config实现
+        - value_regex: 字符串或已编译的正则，结果与 re.findall 一致（有分组时为分组）
+        - use_mmap: 映射整个文件，按行对齐的块解码后以多行模式匹配，适合很大的文件；
+          模式不应跨行；与逐行模式一样把 \\r\\n 与 \\r 当作 \\n，两种模式结果一致
+        - errors: 解码错误的处理方式，同 open
+        """
         """config无非不过sections, options, chains，prefix, values，others这些都可以使用正则实现，这里只是简单的实现方法"""
 
         class TempConfig:
-            def __init__(self, file, value_regex, value_type):
+            def __init__(self, file, value_regex, value_type, use_mmap, errors):
                 self.file = file
                 self.value_regex = value_regex
                 self.value_type = value_type
-
-            def get_configs(self):
-                configs = []
-                for line in open(file_path, "r", encoding="utf-8").readlines():
-                    configs.extend(
-                        list(map(self.value_type, re.findall(self.value_regex, line)))
-                    )
-                return configs
-
-        return TempConfig(file_path, value_regex, value_type)
+                self.use_mmap = use_mmap
+                self.errors = errors
+                self.pattern = re.compile(value_regex)
+
+            def _iter_mmap(self) -> Iterator:
+                pattern = self.pattern.pattern
+                if isinstance(pattern, bytes):
+                    pattern = pattern.decode("utf-8")
+                pattern = re.compile(pattern, self.pattern.flags | re.M)
+                groups = pattern.groups
+                value_type = self.value_type
+                with open(self.file, "rb") as fp:
+                    if not fstat(fp.fileno()).st_size:
+                        return
+                    with mmap(fp.fileno(), 0, access=ACCESS_READ) as mm:
+                        for block in self._blocks(mm, self.errors):
+                            for match in pattern.finditer(block):
+                                if groups == 0:
+                                    yield value_type(match.group())
+                                elif groups == 1:
+                                    yield value_type(match.group(1) or "")
+                                else:
+                                    yield value_type(match.groups(""))
+
+            @staticmethod
+            def _blocks(mm: mmap, errors: str, block_size: int = 4 << 20) -> Iterator[str]:
+                """按行对齐分块解码，像文本模式一样统一换行，内存占用固定"""
+                crlf = mm.find(b"\r") != -1
+                start, size = 0, len(mm)
+                while start < size:
+                    end = mm.find(b"\n", min(start + block_size, size - 1))
+                    end = size if end == -1 else end + 1
+                    block = mm[start:end]
+                    if crlf:
+                        block = block.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+                    yield block.decode("utf-8", errors)
+                    start = end
+
+            def iter_configs(self) -> Iterator:
+                """逐个产生匹配结果，不把整个文件读入内存"""
+                if self.use_mmap:
+                    yield from self._iter_mmap()
+                    return
+                findall = self.pattern.findall
+                value_type = self.value_type
+                with open(self.file, "r", encoding="utf-8", errors=self.errors) as fp:
+                    for line in fp:
+                        for value in findall(line):
+                            yield value_type(value)
+
+            def __iter__(self) -> Iterator:
+                return self.iter_configs()
+
+            def get_configs(self) -> list:
+                return list(self.iter_configs())
+
+        return TempConfig(file_path, value_regex, value_type, use_mmap, errors)
 
     def unzip(self, file_path=None, save_path=None, retain: bool = True) -> str:
         file_path = file_path if file_path else self.file_path
@@ -161,22 +278,41 @@ class FileManage:
     def rename(src, dst):
         rename(src, dst)
 
-    def tree(self) -> list[str]:
+    def tree(self, pattern: str | list[str] = None, regex: str = None, max_depth: int = None) -> list[str]:
         """显示所有文件及其附属文件的路径"""
         return [
-            join(dirpath, file)
-            for dirpath, dirnames, filenames in walk(self.work_path)
-            for file in filenames
+            entry.path
+            for entry in Scanner(self.work_path, pattern, regex, max_depth)
         ]
 
-    def ls(self, filter: Callable = lambda x: bool(x)) -> list[str]:
-        """列出文件"""
-        return [i for i in listdir(self.work_path) if filter(i)]
+    def scan(self, **kwargs) -> Iterator[DirEntry | IndexedEntry]:
+        """逐个产出工作目录下的文件，参数见 Scanner"""
+        return iter(Scanner(self.work_path, **kwargs))
 
-    def lsdir(self, filter: Callable = lambda x: bool(x)) -> list[str]:
-        """列出文件路径"""
-        dirs = [join(self.work_path, path) for path in listdir(self.work_path)]
-        return [i for i in dirs if filter(i)]
+    def ls(self, filter: Callable = lambda x: bool(x), pattern: str | list[str] = None, regex: str = None) -> list[str]:
+        """列出文件"""
+        rule = compile_filter(pattern, regex)
+        with scandir(self.work_path) as it:
+            return [
+                entry.name
+                for entry in it
+                if (rule is None or rule(entry.name)) and filter(entry.name)
+            ]
+
+    def lsdir(
+        self,
+        filter: Callable = lambda x: bool(x),
+        pattern: str | list[str] = None,
+        regex: str = None,
+        files: bool = True,
+        dirs: bool = True,
+    ) -> list[str]:
+        """列出文件路径，files/dirs 使用 DirEntry 缓存的类型信息过滤"""
+        return [
+            entry.path
+            for entry in Scanner(self.work_path, pattern, regex, 0, files, dirs)
+            if filter(entry.path)
+        ]
 
 
 class UrlManage:
@@ -0,0 +1,259 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fnmatch import translate
+from json import dumps, load
+from os import DirEntry, scandir, stat
+from os.path import basename, isfile, join
+from threading import Lock
+from typing import Callable, Iterator
+
+
+def compile_filter(pattern: str | list[str] = None, regex: str = None) -> Callable[[str], bool] | None:
+    """glob与正则只编译一次，返回文件名过滤函数"""
+    rules = []
+    if pattern:
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        rules.append(re.compile("|".join(translate(i) for i in patterns)).match)
+    if regex:
+        rules.append(re.compile(regex).search)
+    if not rules:
+        return None
+    if len(rules) == 1:
+        rule = rules[0]
+        return lambda name: rule(name) is not None
+    return lambda name: all(rule(name) is not None for rule in rules)
+
+
+class IndexedStat:
+    """索引中缓存的文件信息，兼容 os.stat_result 的常用字段"""
+
+    __slots__ = ("st_size", "st_mtime_ns")
+
+    def __init__(self, size: int, mtime_ns: int) -> None:
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+
+class IndexedEntry:
+    """索引中的文件，接口与 os.DirEntry 一致"""
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, dir_path: str, name: str, size: int, mtime_ns: int) -> None:
+        self.path = join(dir_path, name)
+        self.name = name
+        self._stat = IndexedStat(size, mtime_ns)
+
+    def is_file(self, *, follow_symlinks=True) -> bool:
+        return True
+
+    def is_dir(self, *, follow_symlinks=True) -> bool:
+        return False
+
+    def stat(self, *, follow_symlinks=True) -> IndexedStat:
+        return self._stat
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"<IndexedEntry '{self.name}'>"
+
+
+class _DirPath:
+    """索引中的子目录"""
+
+    __slots__ = ("path", "name")
+
+    def __init__(self, path: str, name: str) -> None:
+        self.path = path
+        self.name = name
+
+    def is_file(self, *, follow_symlinks=True) -> bool:
+        return False
+
+    def is_dir(self, *, follow_symlinks=True) -> bool:
+        return True
+
+    def stat(self, *, follow_symlinks=True):
+        return stat(self.path)
+
+    def __fspath__(self) -> str:
+        return self.path
+
+
+class FileIndex:
+    """持久化的文件索引（path, size, mtime）\n
+    目录mtime未变化时直接使用索引内容，不再遍历该目录。
+    原地修改文件内容不会改变目录mtime，此时索引中的size/mtime可能过期"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = Lock()
+        self.changed = False
+        # dir_path: [mtime_ns, [[name, size, mtime_ns], ...], [subdir, ...]]
+        self.dirs: dict[str, list] = {}
+        if isfile(path):
+            with open(path, "r", encoding="utf-8") as fp:
+                self.dirs = load(fp)
+
+    def get(self, dir_path: str, mtime_ns: int) -> list | None:
+        record = self.dirs.get(dir_path)
+        if record and record[0] == mtime_ns:
+            return record
+        return None
+
+    def put(self, dir_path: str, mtime_ns: int, files: list, subdirs: list[str]):
+        with self._lock:
+            old = self.dirs.get(dir_path)
+            if old:
+                for name in set(old[2]) - set(subdirs):
+                    self.drop(join(dir_path, name))
+            self.dirs[dir_path] = [mtime_ns, files, subdirs]
+            self.changed = True
+
+    def drop(self, dir_path: str):
+        record = self.dirs.pop(dir_path, None)
+        if record:
+            for name in record[2]:
+                self.drop(join(dir_path, name))
+
+    def save(self):
+        if not self.changed:
+            return
+        # File 导入了本模块，这里延迟导入
+        from .File import FileManage
+
+        with FileManage.atomic_open(self.path) as fp:
+            fp.write(dumps(self.dirs, separators=(",", ":"), ensure_ascii=False))
+        self.changed = False
+
+
+class Scanner:
+    """基于 os.scandir 的目录遍历，逐个产出 DirEntry
+    - pattern: glob（可为列表），regex: 正则，均匹配文件名
+    - max_depth: 0 表示只遍历根目录
+    - files/dirs: 是否产出文件/目录
+    - workers: 大于1时并行遍历根目录下的各个子目录，子目录之间的顺序不固定
+    - index: FileIndex，重复遍历时跳过未变化的目录
+    """
+
+    def __init__(
+        self,
+        root: str,
+        pattern: str | list[str] = None,
+        regex: str = None,
+        max_depth: int = None,
+        files: bool = True,
+        dirs: bool = False,
+        workers: int = 1,
+        index: FileIndex = None,
+    ) -> None:
+        self.root = root
+        self.filter = compile_filter(pattern, regex)
+        self.max_depth = max_depth
+        self.files = files
+        self.dirs = dirs
+        self.workers = workers
+        self.index = index
+
+    def __iter__(self) -> Iterator[DirEntry | IndexedEntry]:
+        if self.workers > 1:
+            yield from self._parallel()
+        else:
+            yield from self._walk(self.root, 0, stat(self.root).st_mtime_ns)
+        if self.index:
+            self.index.save()
+
+    def _accept(self, name: str) -> bool:
+        return self.filter is None or self.filter(name)
+
+    def _walk(self, dir_path: str, depth: int, mtime_ns: int) -> Iterator:
+        entries, subdirs = self._list(dir_path, mtime_ns)
+        yield from entries
+        if self.max_depth is None or depth < self.max_depth:
+            for sub_path, sub_mtime in subdirs:
+                yield from self._walk(sub_path, depth + 1, sub_mtime)
+
+    def _list(self, dir_path: str, mtime_ns: int) -> tuple[list, list[tuple[str, int]]]:
+        """返回目录下符合条件的条目和子目录 (path, mtime_ns)"""
+        entries = []
+        subdirs = []
+        record = self.index.get(dir_path, mtime_ns) if self.index else None
+        if record:
+            if self.files:
+                entries.extend(
+                    IndexedEntry(dir_path, name, size, mtime)
+                    for name, size, mtime in record[1]
+                    if self._accept(name)
+                )
+            for name in record[2]:
+                sub_path = join(dir_path, name)
+                try:
+                    sub_mtime = stat(sub_path).st_mtime_ns
+                except OSError:
+                    continue
+                subdirs.append((sub_path, sub_mtime))
+                if self.dirs and self._accept(name):
+                    entries.append(_DirPath(sub_path, name))
+            return entries, subdirs
+
+        indexed_files = []
+        try:
+            it = scandir(dir_path)
+        except OSError:
+            return entries, subdirs
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    # 与 os.walk 一致，不进入符号链接目录
+                    if not entry.is_symlink():
+                        try:
+                            mtime = entry.stat().st_mtime_ns if self.index else 0
+                        except OSError:
+                            mtime = 0
+                        subdirs.append((entry.path, mtime))
+                    if self.dirs and self._accept(entry.name):
+                        entries.append(entry)
+                    continue
+                if self.index:
+                    try:
+                        info = entry.stat()
+                    except OSError:
+                        # 失效的符号链接，记录链接本身
+                        try:
+                            info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                    indexed_files.append([entry.name, info.st_size, info.st_mtime_ns])
+                if self.files and self._accept(entry.name):
+                    entries.append(entry)
+        if self.index:
+            self.index.put(dir_path, mtime_ns, indexed_files, [basename(i) for i, _ in subdirs])
+        return entries, subdirs
+
+    def _parallel(self) -> Iterator:
+        entries, subdirs = self._list(self.root, stat(self.root).st_mtime_ns)
+        yield from entries
+        if self.max_depth is not None and self.max_depth < 1:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(lambda p, m: list(self._walk(p, 1, m)), sub_path, sub_mtime)
+                for sub_path, sub_mtime in subdirs
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+
+
+def scan(root: str, **kwargs) -> Iterator[DirEntry | IndexedEntry]:
+    """参数见 Scanner"""
+    return iter(Scanner(root, **kwargs))
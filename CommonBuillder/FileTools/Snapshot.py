@@ -0,0 +1,66 @@
+import marshal
+import mmap
+from hashlib import blake2b
+from os.path import isfile
+from struct import Struct
+
+from .File import FileManage
+
+MAGIC = b"CBSNAP"
+VERSION = 1
+# magic, version, kind长度, 源文件摘要
+_HEADER = Struct("<6sHH16s")
+
+
+def snapshot_path(path: str) -> str:
+    """快照文件与源文件放在一起"""
+    return f"{path}.snap"
+
+
+def source_digest(path: str, chunk_size: int = 1024 * 1024) -> bytes:
+    """源文件内容摘要"""
+    digest = blake2b(digest_size=16)
+    with open(path, "rb") as fp:
+        while chunk := fp.read(chunk_size):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def dump_snapshot(path: str, kind: str, state, digest: bytes):
+    """保存解析结果的二进制快照，kind区分解析规则（类名）"""
+    kind_bytes = kind.encode("utf-8")
+    header = _HEADER.pack(MAGIC, VERSION, len(kind_bytes), digest)
+    with FileManage.atomic_open(snapshot_path(path), "wb") as fp:
+        fp.write(header)
+        fp.write(kind_bytes)
+        marshal.dump(state, fp)
+
+
+def load_snapshot(path: str, kind: str, digest: bytes):
+    """读取快照，源文件摘要或解析规则不一致时返回None"""
+    snap = snapshot_path(path)
+    if not isfile(snap):
+        return None
+    kind_bytes = kind.encode("utf-8")
+    with open(snap, "rb") as fp:
+        try:
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+        with mm:
+            if len(mm) < _HEADER.size:
+                return None
+            magic, version, kind_len, snap_digest = _HEADER.unpack_from(mm, 0)
+            offset = _HEADER.size + kind_len
+            if (
+                magic != MAGIC
+                or version != VERSION
+                or snap_digest != digest
+                or mm[_HEADER.size:offset] != kind_bytes
+            ):
+                return None
+            with memoryview(mm) as view, view[offset:] as payload:
+                try:
+                    return marshal.loads(payload)
+                except (EOFError, ValueError, TypeError):
+                    return None
@@ -0,0 +1,274 @@
+"""将设备操作作为MCP工具提供给本地agent
+
+python -m CommonBuillder.Mcp.Server                                  # stdio，单个客户端
+python -m CommonBuillder.Mcp.Server --transport streamable-http      # 多个客户端并发
+python -m CommonBuillder.Mcp.Server --synthetic 1280x720             # 合成设备，不需要adb
+"""
+import argparse
+from os.path import abspath, commonpath, isabs, join
+from threading import Lock
+from typing import Callable, Literal, Optional
+
+import anyio
+from mcp.server.fastmcp import FastMCP, Image
+
+from ..Android.Adb import Adb, Device
+from ..Android.Backend import Backend, ReplayBackend, SyntheticBackend
+from ..Android.Wait import Text
+
+IMAGE_FORMATS = {"jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+
+
+class DeviceHub:
+    """在多次调用之间保持设备连接与OCR实例\n
+    同一设备上的操作串行执行，不同设备之间并发"""
+
+    def __init__(
+        self,
+        adb_factory: Callable[[], Adb],
+        ocr_factory: Optional[Callable] = None,
+        template_dir: Optional[str] = None,
+    ) -> None:
+        self.adb_factory = adb_factory
+        self.ocr_factory = ocr_factory
+        # 未指定模板目录时只允许访问当前目录
+        self.template_dir = abspath(template_dir or ".")
+        self._adb: Optional[Adb] = None
+        self._ocr = None
+        self._devices: dict[str, Device] = {}
+        self._device_locks: dict[str, Lock] = {}
+        self._lock = Lock()
+        self._ocr_lock = Lock()
+
+    @property
+    def adb(self) -> Adb:
+        with self._lock:
+            if self._adb is None:
+                self._adb = self.adb_factory()
+            return self._adb
+
+    def device_names(self) -> list[str]:
+        return self.adb.get_device_names()
+
+    def device(self, device_id: Optional[str] = None) -> Device:
+        if not device_id:
+            device_id = self.device_names()[0]
+        adb = self.adb
+        with self._lock:
+            device = self._devices.get(device_id)
+            if device is None:
+                device = self._devices[device_id] = adb.get_device(device_id)
+                self._device_locks[device_id] = Lock()
+            return device
+
+    def ocr(self):
+        """OCR只初始化一次，识别时加锁"""
+        with self._ocr_lock:
+            if self._ocr is None:
+                if self.ocr_factory is None:
+                    from ..Ocr.Ocr import OCR
+
+                    self.ocr_factory = OCR
+                self._ocr = self.ocr_factory()
+            return self._ocr
+
+    def readtext(self, img) -> list[str]:
+        ocr = self.ocr()
+        with self._ocr_lock:
+            return ocr.readtext(img)
+
+    def template(self, name: str) -> str:
+        """模板路径，不允许访问模板目录之外的文件"""
+        path = abspath(name if isabs(name) else join(self.template_dir, name))
+        if commonpath([path, self.template_dir]) != self.template_dir:
+            raise ValueError(f"模板不在模板目录中 {name}")
+        return path
+
+    def call(self, device_id: Optional[str], func: Callable[[Device], object], lock: bool = True):
+        device = self.device(device_id)
+        if not lock:
+            return func(device)
+        with self._device_locks[device.device_id]:
+            return func(device)
+
+    async def run(self, device_id: Optional[str], func: Callable[[Device], object], lock: bool = True):
+        """在线程中执行，不阻塞事件循环；lock=False 用于只读且耗时的操作（等待）"""
+        return await anyio.to_thread.run_sync(self.call, device_id, func, lock)
+
+
+def _points(points) -> Optional[list[list[int]]]:
+    return [[int(x), int(y)] for x, y in points] if points else None
+
+
+def _region(region: Optional[list[int]]):
+    if not region:
+        return None
+    x0, y0, x1, y1 = region
+    return ((x0, y0), (x1, y1))
+
+
+def create_server(hub: DeviceHub, name: str = "CommonBuilder", **settings) -> FastMCP:
+    server = FastMCP(name, **settings)
+
+    @server.tool()
+    async def list_devices() -> list[str]:
+        """列出已连接的设备"""
+        return await anyio.to_thread.run_sync(hub.device_names)
+
+    @server.tool()
+    async def screenshot(
+        device_id: Optional[str] = None,
+        max_side: int = 960,
+        format: Literal["jpeg", "png", "webp"] = "jpeg",
+        quality: int = 70,
+        region: Optional[list[int]] = None,
+    ) -> list:
+        """截图，默认缩小到最长边960像素并以JPEG压缩；region: [x0, y0, x1, y1]\n
+        同时返回设备分辨率与缩放比例，click 使用设备坐标：x = 图像x / scale + offset[0]，y 同理"""
+
+        def capture(device: Device) -> tuple[bytes, dict]:
+            screen = device.screenshot()
+            img = device.cutScreenshot(screen, _region(region))
+            data = device.encodeImg(img, IMAGE_FORMATS[format], quality, max_side)
+            h, w = img.shape[:2]
+            scale = min(1.0, max_side / max(h, w)) if max_side else 1.0
+            info = {
+                "device_size": [int(screen.shape[1]), int(screen.shape[0])],
+                "image_size": [round(w * scale), round(h * scale)],
+                "scale": scale,
+                "offset": [int(region[0]), int(region[1])] if region else [0, 0],
+            }
+            return data, info
+
+        data, info = await hub.run(device_id, capture)
+        return [Image(data=data, format=format), info]
+
+    @server.tool()
+    async def find_image(
+        template: str,
+        device_id: Optional[str] = None,
+        per: float = 0.9,
+        region: Optional[list[int]] = None,
+        scaled: bool = False,
+        search: bool = False,
+    ) -> dict:
+        """在屏幕上查找模板图片，返回匹配的中心点；scaled: 按设备分辨率缩放模板"""
+        path = hub.template(template)
+
+        def find(device: Device):
+            if scaled or search:
+                return device.findImageDetailScaled(path, _region(region), per, search=search)
+            return device.findImageDetail(path, _region(region), per)
+
+        detail = await hub.run(device_id, find)
+        return {
+            "matched": detail.matched,
+            "centers": _points(detail.matchTempleteCenterPoints),
+            "size": [int(i) for i in detail.templeteSize],
+            "scale": detail.scale,
+            "score": detail.score,
+        }
+
+    @server.tool()
+    async def click(x: int, y: int, device_id: Optional[str] = None) -> str:
+        """点击屏幕坐标"""
+        await hub.run(device_id, lambda device: device.click(x, y))
+        return "ok"
+
+    @server.tool()
+    async def click_image(template: str, device_id: Optional[str] = None, per: float = 0.9) -> bool:
+        """点击匹配到的模板，未匹配返回false"""
+        path = hub.template(template)
+        return await hub.run(device_id, lambda device: device.clickButton(path, per))
+
+    @server.tool()
+    async def wait_for(
+        template: Optional[str] = None,
+        text: Optional[str] = None,
+        device_id: Optional[str] = None,
+        timeout: float = 10.0,
+        per: float = 0.9,
+    ) -> dict:
+        """等待模板或文字出现，超时返回 found=false"""
+        if template:
+            target = hub.template(template)
+        elif text:
+            target = Text(text)
+        else:
+            raise ValueError("需要 template 或 text")
+
+        def wait(device: Device):
+            # hub.readtext 会对OCR加锁
+            ocr = hub if text else None
+            try:
+                return device.wait_for(target, timeout, per=per, ocr=ocr)
+            except TimeoutError:
+                return None
+
+        result = await hub.run(device_id, wait, lock=False)
+        if result is None:
+            return {"found": False}
+        if isinstance(result, list):
+            return {"found": True, "texts": result}
+        return {"found": True, "centers": _points(result.matchTempleteCenterPoints)}
+
+    @server.tool()
+    async def ocr(device_id: Optional[str] = None, region: Optional[list[int]] = None) -> list[str]:
+        """识别屏幕文字；region: [x0, y0, x1, y1]"""
+
+        def capture(device: Device):
+            return device.cutScreenshot(device.screenshot(), _region(region))
+
+        img = await hub.run(device_id, capture)
+        return await anyio.to_thread.run_sync(hub.readtext, img)
+
+    @server.tool()
+    async def launch_app(activity: str, device_id: Optional[str] = None) -> str:
+        """启动应用，activity: 包名/Activity"""
+        output = await hub.run(device_id, lambda device: device.launch_app(activity))
+        return output.decode(errors="replace")
+
+    @server.tool()
+    async def kill_app(package_name: str, device_id: Optional[str] = None) -> str:
+        """结束应用"""
+        await hub.run(device_id, lambda device: device.kill_app(package_name))
+        return "ok"
+
+    @server.tool()
+    async def app_pid(package_name: str, device_id: Optional[str] = None) -> Optional[str]:
+        """应用的pid，未运行时为null"""
+        return await hub.run(device_id, lambda device: device.get_app_pid(package_name))
+
+    return server
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(prog="python -m CommonBuillder.Mcp.Server")
+    parser.add_argument("--transport", default="stdio", choices=["stdio", "sse", "streamable-http"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--adb", help="adb路径")
+    parser.add_argument("--connect-port", type=int, default=7555)
+    parser.add_argument("--templates", help="模板目录，工具只能访问其中的模板，默认为当前目录")
+    fake = parser.add_mutually_exclusive_group()
+    fake.add_argument("--synthetic", metavar="WxH", help="使用合成设备")
+    fake.add_argument("--replay", metavar="DIR", help="回放RecordBackend录制的会话")
+    options = parser.parse_args(argv)
+
+    backend: Optional[Backend] = None
+    if options.synthetic:
+        w, h = map(int, options.synthetic.lower().split("x"))
+        backend = SyntheticBackend((w, h))
+    elif options.replay:
+        backend = ReplayBackend(options.replay)
+
+    hub = DeviceHub(
+        lambda: Adb(options.adb, options.connect_port, backend=backend),
+        template_dir=options.templates,
+    )
+    server = create_server(hub, host=options.host, port=options.port)
+    server.run(options.transport)
+
+
+if __name__ == "__main__":
+    main()
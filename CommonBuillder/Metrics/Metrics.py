@@ -0,0 +1,243 @@
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps
+from threading import Lock, Thread, local
+from typing import Callable, Optional
+
+# 秒
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "commonbuilder"
+
+
+class Histogram:
+    """累积分桶的延迟直方图"""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        ans = []
+        total = 0
+        for i in self.counts:
+            total += i
+            ans.append(total)
+        return ans
+
+
+class Span:
+    __slots__ = ("name", "device", "parent", "start", "duration", "error")
+
+    def __init__(self, name: str, device: str, parent: Optional[str], start: float, duration: float, error: Optional[str]) -> None:
+        self.name = name
+        self.device = device
+        self.parent = parent
+        self.start = start
+        self.duration = duration
+        self.error = error
+
+    def toDict(self) -> dict:
+        return {i: getattr(self, i) for i in self.__slots__}
+
+
+class Metrics:
+    """设备操作的耗时直方图、计数器与最近的span\n
+    默认关闭，关闭时被 traced 装饰的函数只多一次属性判断"""
+
+    def __init__(self, max_spans: int = 10000, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled = False
+        self.buckets = buckets
+        self._lock = Lock()
+        self._local = local()
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._server = None
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._spans.clear()
+
+    def _stack(self) -> list[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name: str, device: str, start: float, duration: float, error: Optional[str] = None, parent: Optional[str] = None):
+        with self._lock:
+            key = (name, device)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(duration)
+            if error:
+                counter = ("op_errors", (("op", name), ("device", device), ("error", error)))
+                self._counters[counter] = self._counters.get(counter, 0) + 1
+            self._spans.append(Span(name, device, parent, start, duration, error))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器，导出为 {PREFIX}_{name}_total"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def span(self, name: str, device: str = ""):
+        """with metrics.span("name", device): ..."""
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, device)
+
+    @contextmanager
+    def _span(self, name: str, device: str):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        wall = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            self.record(name, device, wall, duration, error, parent)
+
+    def spans(self) -> list[dict]:
+        with self._lock:
+            return [i.toDict() for i in self._spans]
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            family = f"{PREFIX}_op_seconds"
+            lines.append(f"# HELP {family} 设备操作耗时")
+            lines.append(f"# TYPE {family} histogram")
+            for (name, device), histogram in sorted(self._histograms.items()):
+                labels = f'op="{_escape(name)}",device="{_escape(device)}"'
+                for le, count in zip(histogram.buckets + ("+Inf",), histogram.cumulative()):
+                    lines.append(f'{family}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{family}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{family}_count{{{labels}}} {histogram.count}")
+
+            families: dict[str, list[str]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                family = f"{PREFIX}_{name}_total"
+                text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                families.setdefault(family, []).append(f"{family}{{{text}}} {value}")
+            for family, samples in families.items():
+                lines.append(f"# TYPE {family} counter")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> dict:
+        with self._lock:
+            histograms = [
+                {
+                    "op": name,
+                    "device": device,
+                    "buckets": list(histogram.buckets),
+                    "counts": list(histogram.counts),
+                    "sum": histogram.sum,
+                    "count": histogram.count,
+                }
+                for (name, device), histogram in self._histograms.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {"histograms": histograms, "counters": counters, "spans": self.spans()}
+
+    def dump_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write(dumps(self.to_json(), ensure_ascii=False))
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """后台提供 /metrics（Prometheus）与 /spans（JSON）"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                match self.path:
+                    case "/metrics":
+                        body = metrics.to_prometheus().encode()
+                        content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    case "/spans":
+                        body = dumps(metrics.to_json(), ensure_ascii=False).encode()
+                        content_type = "application/json"
+                    case _:
+                        self.send_error(404)
+                        return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+def traced(name: str, device_arg: Optional[int] = None) -> Callable:
+    """记录函数耗时，device标签取 args[device_arg] 或 self.device_id"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            if device_arg is not None and len(args) > device_arg:
+                device = str(args[device_arg])
+            else:
+                device = getattr(args[0], "device_id", "") if args else ""
+            with metrics._span(name, device):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -2,10 +2,13 @@ from paddleocr import PaddleOCR
 
 from cv2.typing import MatLike
 
+from ..Metrics.Metrics import traced
+
 class OCR(PaddleOCR):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    @traced("ocr_readtext")
     def readtext(self, img: MatLike, det = True, rec = True, cls = False, bin = False, inv = False) -> list:
         data = self.predict(
             img,
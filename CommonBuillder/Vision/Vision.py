@@ -0,0 +1,292 @@
+import asyncio
+import base64
+import os
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock, Thread
+from typing import Optional, Sequence
+
+import cv2
+import httpx
+import numpy as np
+from cv2.typing import MatLike
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from ..Android.Adb import Device
+from ..Metrics.Metrics import metrics
+
+MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+
+def dhash(img: MatLike, size: int = 8) -> int:
+    """差值哈希（size*size 位），压缩噪声等细微变化不会改变哈希或只改变少数几位"""
+    w, h = (size + 1) * 16, size * 16
+    if img.shape[1] > w and img.shape[0] > h:
+        # 直接对整帧做 INTER_AREA 很慢，先用线性插值缩小到哈希尺寸的16倍
+        img = cv2.resize(img, (w, h), interpolation=cv2.INTER_LINEAR)
+    small = cv2.resize(img, (size + 1, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def content_hash(img: MatLike) -> int:
+    """像素内容的摘要，任何像素不同结果都不同（sha256 通常有硬件加速，比 blake2b 快）"""
+    digest = sha256(np.ascontiguousarray(img).data)
+    digest.update(repr((img.shape, img.dtype.str)).encode())
+    return int.from_bytes(digest.digest()[:16], "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _roi(roi) -> Optional[tuple]:
+    if not roi:
+        return None
+    (x0, y0), (x1, y1) = roi
+    return ((int(x0), int(y0)), (int(x1), int(y1)))
+
+
+def _crop(img: MatLike, roi: Optional[tuple]) -> MatLike:
+    if not roi:
+        return img
+    (x0, y0), (x1, y1) = roi
+    return img[y0:y1, x0:x1]
+
+
+class ResponseCache:
+    """以 (请求参数, 画面哈希) 为键的LRU缓存
+    - max_distance: 0 时哈希须完全相同；大于0时按汉明距离查找相近的画面（配合 dhash）
+    """
+
+    def __init__(self, max_items: int = 256, max_distance: int = 0) -> None:
+        self.max_items = max_items
+        self.max_distance = max_distance
+        self._lock = Lock()
+        self._items: OrderedDict[tuple, str] = OrderedDict()
+
+    def get(self, key: tuple, frame_hash: int) -> Optional[str]:
+        with self._lock:
+            item = (key, frame_hash)
+            answer = self._items.get(item)
+            if answer is None and self.max_distance:
+                for (other_key, other_hash), value in reversed(self._items.items()):
+                    if other_key == key and hamming(other_hash, frame_hash) <= self.max_distance:
+                        item, answer = (other_key, other_hash), value
+                        break
+            if answer is not None:
+                self._items.move_to_end(item)
+            return answer
+
+    def put(self, key: tuple, frame_hash: int, answer: str):
+        with self._lock:
+            self._items[(key, frame_hash)] = answer
+            self._items.move_to_end((key, frame_hash))
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class ScreenAnalyzer:
+    """通过OpenAI兼容接口用视觉模型分析画面
+    - base_url / api_key: 接口地址与密钥，本地服务可不填密钥
+    - roi: 只发送该区域 ((x0, y0), (x1, y1))
+    - max_side / ext / quality: 发送前缩小并压缩，ext 为 .jpg .webp .png
+    - max_concurrency: 同时进行的请求数（也是连接池大小），其余请求排队
+    - 相同画面与相同提示词的回答会被缓存，同时发起的相同请求只发送一次
+    - max_distance: 0 时按像素内容摘要判断画面相同；大于0时使用64位差值哈希，
+      汉明距离不超过该值视为同一画面，数字、按钮文字等小区域的变化可能被忽略
+    - async 方法只能在同一个事件循环中使用；同步方法在内部的后台事件循环中执行
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        client: Optional[AsyncOpenAI] = None,
+        system: Optional[str] = None,
+        max_side: Optional[int] = 768,
+        ext: str = ".jpg",
+        quality: Optional[int] = 70,
+        detail: str = "low",
+        max_tokens: Optional[int] = None,
+        max_concurrency: int = 4,
+        cache_size: int = 256,
+        max_distance: int = 0,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+    ) -> None:
+        if ext.lower() not in MIME_TYPES:
+            raise ValueError(f"不支持的图像格式 {ext}")
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.system = system
+        self.max_side = max_side
+        self.ext = ext.lower()
+        self.quality = quality
+        self.detail = detail
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = ResponseCache(cache_size, max_distance)
+        self.client = client
+        self._owns_client = client is None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: dict[tuple, asyncio.Future] = {}
+        self._runner: Optional[asyncio.AbstractEventLoop] = None
+        self._runner_lock = Lock()
+
+    def _bind(self):
+        """客户端与信号量绑定到第一次使用的事件循环"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if self.client is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency
+                )
+                self.client = AsyncOpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key or os.environ.get("OPENAI_API_KEY") or "EMPTY",
+                    timeout=self.timeout,
+                    max_retries=self.max_retries,
+                    http_client=DefaultAsyncHttpxClient(limits=limits, timeout=self.timeout),
+                )
+        elif self._loop is not loop:
+            raise RuntimeError("ScreenAnalyzer 不能在多个事件循环中使用")
+
+    def frame_hash(self, img: MatLike) -> int:
+        """缓存使用的画面哈希，见 max_distance"""
+        return dhash(img) if self.cache.max_distance else content_hash(img)
+
+    def encode(self, img: MatLike) -> str:
+        """缩小并压缩为 data URL"""
+        data = Device.encodeImg(img, self.ext, self.quality, self.max_side)
+        return f"data:{MIME_TYPES[self.ext]};base64,{base64.b64encode(data).decode('ascii')}"
+
+    def messages(self, prompt: str, url: str) -> list[dict]:
+        messages = [{"role": "system", "content": self.system}] if self.system else []
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": url, "detail": self.detail}},
+                ],
+            }
+        )
+        return messages
+
+    async def _request(self, img: MatLike, prompt: str) -> str:
+        url = await asyncio.to_thread(self.encode, img)
+        kwargs = {"max_tokens": self.max_tokens} if self.max_tokens else {}
+        async with self._semaphore:
+            wall = time.time()
+            start = time.perf_counter()
+            error = None
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model, messages=self.messages(prompt, url), **kwargs
+                )
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                if metrics.enabled:
+                    metrics.record("vision_request", self.model, wall, time.perf_counter() - start, error)
+        if response.usage:
+            metrics.inc("vision_tokens", response.usage.total_tokens, model=self.model)
+        return response.choices[0].message.content or ""
+
+    async def analyze(self, img: MatLike, prompt: str, roi=None) -> str:
+        """分析画面（或其中的roi区域），返回模型的回答"""
+        self._bind()
+        roi = _roi(roi)
+        img = _crop(img, roi)
+        # 整帧哈希需要几毫秒，放到线程中以免阻塞事件循环、使 analyze_many 串行
+        frame_hash = await asyncio.to_thread(self.frame_hash, img)
+        key = (self.model, self.system, self.detail, prompt, roi)
+        answer = self.cache.get(key, frame_hash)
+        if answer is not None:
+            metrics.inc("vision_cache_hits", model=self.model)
+            return answer
+
+        pending_key = key + (frame_hash,)
+        future = self._pending.get(pending_key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._loop.create_future()
+        self._pending[pending_key] = future
+        try:
+            answer = await self._request(img, prompt)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            self.cache.put(key, frame_hash, answer)
+            future.set_result(answer)
+            return answer
+        finally:
+            del self._pending[pending_key]
+
+    async def analyze_many(self, items: Sequence[tuple]) -> list[str]:
+        """并发分析多个画面，items 为 (img, prompt) 或 (img, prompt, roi)"""
+        return list(await asyncio.gather(*(self.analyze(*item) for item in items)))
+
+    async def aclose(self):
+        if self.client is not None and self._owns_client:
+            await self.client.close()
+            self.client = None
+        self._loop = None
+
+    def _run(self, coro):
+        with self._runner_lock:
+            if self._runner is None:
+                self._runner = asyncio.new_event_loop()
+                Thread(target=self._runner.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._runner).result()
+
+    def ask(self, img: MatLike, prompt: str, roi=None) -> str:
+        """analyze 的同步版本，可在多个线程中同时调用"""
+        return self._run(self.analyze(img, prompt, roi))
+
+    def ask_many(self, items: Sequence[tuple]) -> list[str]:
+        """analyze_many 的同步版本"""
+        return self._run(self.analyze_many(items))
+
+    def ask_device(self, device: Device, prompt: str, roi=None) -> str:
+        """截图并分析"""
+        return self.ask(device.screenshot(), prompt, roi)
+
+    def close(self):
+        """关闭同步方法使用的后台事件循环与客户端"""
+        with self._runner_lock:
+            runner, self._runner = self._runner, None
+        if runner is not None:
+            asyncio.run_coroutine_threadsafe(self.aclose(), runner).result()
+            runner.call_soon_threadsafe(runner.stop)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
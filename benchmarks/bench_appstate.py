@@ -0,0 +1,33 @@
+"""应用状态查询：逐个 pidof/dumpsys 与一次快照，使用带模拟adb耗时的合成设备"""
+from CommonBuillder.Android.Adb import Adb
+from CommonBuillder.Android.AppState import SNAPSHOT_COMMAND, AppSnapshot
+from CommonBuillder.Android.Backend import SyntheticBackend
+
+from .fixtures import app_state_output
+
+PACKAGES = 30
+LATENCY = 0.002
+
+
+def register(suite, options):
+    packages = [f"com.example.app{i}" for i in range(PACKAGES)]
+    output = app_state_output(packages)
+    text = output.decode()
+    suite.add(f"appstate.parse[{PACKAGES} apps]", lambda: AppSnapshot.parse("synthetic-0", text))
+
+    responses = {("-s", "synthetic-0", "shell", SNAPSHOT_COMMAND): output}
+    device = Adb(backend=SyntheticBackend(responses=responses, latency=LATENCY)).get_device()
+
+    def per_package(_):
+        for package in packages:
+            device.get_app_pid(package)
+            device.get_app_activity(package)
+
+    def snapshot(_):
+        current = device.app_snapshot(ttl=0)
+        for package in packages:
+            current.get(package)
+
+    suite.add(f"appstate.per_package[{PACKAGES} apps]", per_package, setup=lambda: None)
+    suite.add(f"appstate.snapshot[{PACKAGES} apps]", snapshot, setup=lambda: None)
+    suite.add("appstate.snapshot_cached", lambda: device.app_snapshot(ttl=60).get(packages[0]))
@@ -0,0 +1,21 @@
+"""截图解码（PNG与原始数据）与灰度转换"""
+import cv2
+import numpy as np
+
+from .fixtures import RESOLUTIONS, block_frame, replay_device, synthetic_device
+
+
+def register(suite, options):
+    for w, h in RESOLUTIONS:
+        device = synthetic_device((w, h))
+        frame = block_frame((w, h))
+        png = cv2.imencode(".png", frame)[1].tobytes()
+        raw = np.array([w, h, 1, 0], np.uint32).tobytes() + cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA).tobytes()
+        suite.add(f"capture.convertImg.png[{h}p]", lambda d=device, b=png: d.convertImg(b))
+        suite.add(f"capture.convertImg.raw[{h}p]", lambda d=device, b=raw: d.convertRawImg(b))
+        suite.add(f"capture.toGrayImg[{h}p]", lambda d=device, f=frame: d.toGrayImg(f))
+        suite.add(f"capture.screenshot.synthetic[{h}p]", lambda d=device: d.screenshot())
+
+    if options.replay:
+        device = replay_device(options.replay)
+        suite.add("capture.screenshot.replay", device.screenshot)
@@ -0,0 +1,27 @@
+"""IniConfig 解析、快照读取与保存"""
+import atexit
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from CommonBuillder.FileTools.ConfigUtils import IniConfig
+
+from .fixtures import make_ini
+
+
+def register(suite, options):
+    tmp = TemporaryDirectory()
+    atexit.register(tmp.cleanup)
+    path = join(tmp.name, "bench.ini")
+    make_ini(path, 1000, 20)
+    IniConfig(path, snapshot=True)
+
+    suite.add("config.ini.parse[20k]", lambda: IniConfig(path))
+    suite.add("config.ini.snapshot_load[20k]", lambda: IniConfig(path, snapshot=True))
+
+    def modified():
+        config = IniConfig(path)
+        for i in range(0, 1000, 10):
+            config.set_config(f"section{i}", "option0", f"changed{i}")
+        return config
+
+    suite.add("config.ini.save[100 changes]", lambda config: config.save(), setup=modified)
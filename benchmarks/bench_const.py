@@ -0,0 +1,17 @@
+"""Const 读取、写入与迭代"""
+from CommonBuillder.FileTools.Base.Define import Const
+
+
+def make_const(size: int) -> Const:
+    const = Const()
+    for i in range(size):
+        const[f"NAME_{i}"] = i
+    return const
+
+
+def register(suite, options):
+    const = make_const(1000).freeze()
+    suite.add("const.getattr", lambda: const.NAME_500)
+    suite.add("const.getitem", lambda: const["NAME_500"])
+    suite.add("const.setitem[1000]", lambda: make_const(1000))
+    suite.add("const.iterate[1000]", lambda: list(const))
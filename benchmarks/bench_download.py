@@ -0,0 +1,20 @@
+"""UrlManage.dowload，使用本地HTTP服务"""
+import atexit
+from tempfile import TemporaryDirectory
+
+from CommonBuillder.FileTools.File import UrlManage
+
+from .fixtures import LocalServer, write_random_file
+
+
+def register(suite, options):
+    serve_dir = TemporaryDirectory()
+    save_dir = TemporaryDirectory()
+    atexit.register(serve_dir.cleanup)
+    atexit.register(save_dir.cleanup)
+    write_random_file(serve_dir.name, "payload.bin", 16 * 1024 * 1024)
+    server = LocalServer(serve_dir.name).__enter__()
+    atexit.register(server.__exit__)
+
+    url = server.url("payload.bin")
+    suite.add("download.dowload[16MiB]", lambda: UrlManage.dowload(url, save_dir.name))
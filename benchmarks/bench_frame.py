@@ -0,0 +1,18 @@
+"""进程间传递截图：pickle整帧与共享内存句柄"""
+import atexit
+import pickle
+
+from CommonBuillder.Android.Frame import FramePool, open_frame
+
+from .fixtures import RESOLUTIONS, block_frame
+
+
+def register(suite, options):
+    pool = FramePool(slots=len(RESOLUTIONS) + 1)
+    atexit.register(pool.close)
+    for w, h in RESOLUTIONS:
+        frame = block_frame((w, h))
+        handle = pool.write(frame)
+        suite.add(f"frame.pickle_ndarray[{h}p]", lambda f=frame: pickle.loads(pickle.dumps(f, pickle.HIGHEST_PROTOCOL)))
+        suite.add(f"frame.pickle_handle[{h}p]", lambda f=handle: open_frame(pickle.loads(pickle.dumps(f, pickle.HIGHEST_PROTOCOL))))
+        suite.add(f"frame.pool_write[{h}p]", lambda f=frame: pool.release(pool.write(f)))
@@ -0,0 +1,59 @@
+"""FileManage.len_lines 与 tmp_config 在大日志文件上与原实现的比较"""
+import atexit
+import re
+from collections import deque
+from os.path import join
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from CommonBuillder.FileTools.File import FileManage
+
+LOG_SIZE = 32 * 1024 * 1024
+VALUE_REGEX = r"latency=(\d+)ms"
+
+
+def write_log(path: str, size: int):
+    rng = np.random.default_rng(0)
+    with open(path, "w", encoding="utf-8") as fp:
+        written = 0
+        while written < size:
+            values = rng.integers(0, 1000, 4096)
+            chunk = "".join(
+                f"10-18 12:00:{i % 60:02d}.000  1234  5678 I Worker: task {i} done latency={v}ms\n"
+                if i % 4 == 0
+                else f"10-18 12:00:{i % 60:02d}.000  1234  5678 D Render: frame {i} drawn\n"
+                for i, v in enumerate(values)
+            )
+            fp.write(chunk)
+            written += len(chunk)
+
+
+def legacy_len_lines(file_path: str) -> int:
+    return len(open(file_path, "r", encoding="utf-8").readlines())
+
+
+def legacy_get_configs(file_path: str, value_regex, value_type):
+    configs = []
+    for line in open(file_path, "r", encoding="utf-8").readlines():
+        configs.extend(list(map(value_type, re.findall(value_regex, line))))
+    return configs
+
+
+def register(suite, options):
+    tmp = TemporaryDirectory()
+    atexit.register(tmp.cleanup)
+    path = join(tmp.name, "device.log")
+    write_log(path, LOG_SIZE)
+    name = f"{LOG_SIZE >> 20}MiB"
+
+    suite.add(f"lines.len_lines.legacy[{name}]", lambda: legacy_len_lines(path))
+    suite.add(f"lines.len_lines[{name}]", lambda: FileManage.len_lines(path))
+
+    config = FileManage.tmp_config(path, value_regex=VALUE_REGEX, value_type=int)
+    mapped = FileManage.tmp_config(path, value_regex=VALUE_REGEX, value_type=int, use_mmap=True)
+    suite.add(f"lines.get_configs.legacy[{name}]", lambda: legacy_get_configs(path, VALUE_REGEX, int))
+    suite.add(f"lines.get_configs[{name}]", lambda: config.get_configs())
+    # 只消费不保存，峰值内存与文件大小无关
+    suite.add(f"lines.iter_configs[{name}]", lambda: deque(config.iter_configs(), maxlen=0))
+    suite.add(f"lines.iter_configs.mmap[{name}]", lambda: deque(mapped.iter_configs(), maxlen=0))
@@ -0,0 +1,39 @@
+"""模板匹配与匹配点合并"""
+import cv2
+import numpy as np
+
+from .fixtures import RESOLUTIONS, TEMPLATE_SIZES, block_frame, synthetic_device
+
+
+def register(suite, options):
+    for w, h in RESOLUTIONS:
+        device = synthetic_device((w, h))
+        gray = device.toGrayImg(block_frame((w, h)))
+        for size in TEMPLATE_SIZES:
+            x, y = w // 3, h // 3
+            template = gray[y:y + size, x:x + size].copy()
+            suite.add(
+                f"match.findImageDetail[{h}p,{size}px]",
+                lambda d=device, t=template, g=gray: d.findImageDetail(t, grayScreenshot=g),
+            )
+
+    base = block_frame((1280, 720))
+    template = cv2.cvtColor(base[240:336, 426:522], cv2.COLOR_BGR2GRAY)
+    for w, h in RESOLUTIONS[1:]:
+        device = synthetic_device((w, h))
+        gray = device.toGrayImg(cv2.resize(base, (w, h)))
+        device.precomputeTemplates([template], (1280, 720), search=True)
+        suite.add(
+            f"match.findImageDetailScaled[{h}p]",
+            lambda d=device, g=gray: d.findImageDetailScaled(template, grayScreenshot=g, base_size=(1280, 720)),
+        )
+        suite.add(
+            f"match.findImageDetailScaled.search[{h}p]",
+            lambda d=device, g=gray: d.findImageDetailScaled(template, grayScreenshot=g, base_size=(1280, 720), search=True),
+        )
+
+    device = synthetic_device()
+    # 模拟大量相邻的匹配点
+    ys, xs = np.mgrid[0:200:2, 0:400:2]
+    locations = (ys.ravel(), xs.ravel())
+    suite.add("match._ceilPosition[20k points]", lambda: device._ceilPosition(locations))
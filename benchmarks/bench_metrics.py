@@ -0,0 +1,30 @@
+"""traced 装饰器在关闭与开启时的开销"""
+from CommonBuillder.Metrics.Metrics import Metrics, metrics, traced
+
+
+def register(suite, options):
+    def plain(x):
+        return x
+
+    wrapped = traced("bench_noop")(plain)
+    suite.add("metrics.plain_call", lambda: plain(1))
+    suite.add("metrics.traced_disabled", lambda: wrapped(1))
+
+    def enabled_call(_):
+        metrics.enabled = True
+        try:
+            wrapped(1)
+        finally:
+            metrics.enabled = False
+
+    suite.add("metrics.traced_enabled", enabled_call, setup=lambda: metrics.reset())
+    suite.add("metrics.to_prometheus", lambda m: m.to_prometheus(), setup=lambda: _filled())
+
+
+def _filled() -> Metrics:
+    filled = Metrics()
+    for op in ("adb_execute", "screenshot", "convert_img", "find_image", "click"):
+        for device in range(8):
+            for i in range(100):
+                filled.record(op, f"device-{device}", 0.0, i / 1000)
+    return filled
@@ -0,0 +1,21 @@
+"""OCR.readtext，需要 paddleocr 及其模型"""
+from importlib.util import find_spec
+
+import cv2
+import numpy as np
+
+
+def register(suite, options):
+    if not find_spec("paddleocr"):
+        suite.skip("ocr.readtext", "paddleocr 未安装")
+        return
+    from CommonBuillder.Ocr.Ocr import OCR
+
+    img = np.full((120, 640, 3), 255, np.uint8)
+    cv2.putText(img, "CommonBuilder 123", (10, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+    try:
+        ocr = OCR()
+    except Exception as e:
+        suite.skip("ocr.readtext", f"初始化失败 {e}")
+        return
+    suite.add("ocr.readtext[640x120]", lambda: ocr.readtext(img))
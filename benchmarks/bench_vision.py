@@ -0,0 +1,39 @@
+"""视觉模型请求：载荷编码、感知哈希、缓存命中与并发请求，使用本地模拟服务"""
+import atexit
+
+from CommonBuillder.Android.Adb import Device
+from CommonBuillder.Vision.Vision import ScreenAnalyzer, dhash
+
+from .fixtures import MockOpenAIServer, block_frame
+
+FRAMES = 8
+LATENCY = 0.02
+
+
+def register(suite, options):
+    frame = block_frame((1920, 1080))
+    suite.add("vision.encode_png_full[1920x1080]", lambda: Device.encodeImg(frame))
+    suite.add("vision.encode_jpeg_768[1920x1080]", lambda: Device.encodeImg(frame, ".jpg", 70, 768))
+    suite.add("vision.dhash[1920x1080]", lambda: dhash(frame))
+
+    server = MockOpenAIServer(delay=LATENCY).__enter__()
+    analyzer = ScreenAnalyzer("mock", base_url=server.base_url, max_concurrency=FRAMES)
+    atexit.register(server.__exit__)
+    atexit.register(analyzer.close)
+
+    analyzer.ask(frame, "describe")
+    suite.add("vision.ask_cached", lambda: analyzer.ask(frame, "describe"))
+
+    frames = [block_frame((1920, 1080), seed) for seed in range(FRAMES)]
+
+    def sequential(_):
+        analyzer.cache.clear()
+        for img in frames:
+            analyzer.ask(img, "describe")
+
+    def batched(_):
+        analyzer.cache.clear()
+        analyzer.ask_many([(img, "describe") for img in frames])
+
+    suite.add(f"vision.ask_sequential[{FRAMES} frames]", sequential, setup=lambda: None)
+    suite.add(f"vision.ask_many[{FRAMES} frames]", batched, setup=lambda: None)
@@ -0,0 +1,168 @@
+"""合成或录制的基准数据"""
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from os.path import join
+from threading import Thread
+
+import cv2
+import numpy as np
+
+from CommonBuillder.Android.Adb import Adb, Device
+from CommonBuillder.Android.Backend import ReplayBackend, SyntheticBackend
+
+RESOLUTIONS = [(1280, 720), (1920, 1080), (2560, 1440)]
+TEMPLATE_SIZES = [32, 96, 256]
+
+
+def block_frame(size: tuple[int, int], seed: int = 0, block: int = 16) -> np.ndarray:
+    """随机色块组成的画面，模板匹配结果唯一且PNG可压缩"""
+    w, h = size
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (h // block + 1, w // block + 1, 3), np.uint8)
+    return cv2.resize(small, None, fx=block, fy=block, interpolation=cv2.INTER_NEAREST)[:h, :w]
+
+
+def synthetic_device(size: tuple[int, int] = (1280, 720), frames=None) -> Device:
+    frames = frames if frames is not None else [block_frame(size)]
+    return Adb(backend=SyntheticBackend(size, frames)).get_device()
+
+
+def replay_device(path: str) -> Device:
+    return Adb(backend=ReplayBackend(path)).get_device()
+
+
+def app_state_output(packages: list[str], resumed: int = 0, stopped: tuple[int, ...] = ()) -> bytes:
+    """SNAPSHOT_COMMAND 的输出：packages 都在运行并各有一个Activity，resumed 为前台应用的下标"""
+    from CommonBuillder.Android.AppState import MARKER
+
+    lines = ["PID NAME", "1 init", "2 [kthreadd]", "300 system_server"]
+    lines += [f"{1000 + i} {package}" for i, package in enumerate(packages) if i not in stopped]
+    lines += [f"{5000 + i} {package}:remote" for i, package in enumerate(packages) if i not in stopped]
+    lines.append(MARKER)
+    lines.append("ACTIVITY MANAGER ACTIVITIES (dumpsys activity activities)")
+    lines.append("Display #0 (activities from top to bottom):")
+    order = [resumed] + [i for i in range(len(packages)) if i != resumed]
+    for task, i in enumerate(order):
+        if i in stopped:
+            continue
+        package = packages[i]
+        state = "RESUMED" if i == resumed else "STOPPED"
+        lines += [
+            f"  * Task{{{task:x}a1 #{100 + task} type=standard A=10{i:03d}:{package} U=0 visible={i == resumed}}}",
+            f"    affinity=10{i:03d}:{package}",
+            f"    * ActivityRecord{{{i:x}f0e u0 {package}/.MainActivity t{100 + task}}}",
+            f"      packageName={package} processName={package}",
+            f"      mActivityComponent={package}/.MainActivity",
+            f"      state={state} delayedResume=false finishing=false",
+        ]
+    top = packages[resumed]
+    lines += [
+        f"  ResumedActivity: ActivityRecord{{{resumed:x}f0e u0 {top}/.MainActivity t100}}",
+        f"mFocusedApp=ActivityRecord{{{resumed:x}f0e u0 {top}/.MainActivity t100}}",
+    ]
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+def make_ini(path: str, sections: int = 1000, options: int = 20):
+    with open(path, "w", encoding="utf-8") as fp:
+        for sec in range(sections):
+            fp.write(f"; section {sec}\n[section{sec}]\n")
+            for opt in range(options):
+                fp.write(f"option{opt} = value{sec}_{opt}\n")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """在后台线程中提供目录的HTTP服务"""
+
+    def __init__(self, directory: str) -> None:
+        handler = partial(_QuietHandler, directory=directory)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def write_random_file(directory: str, name: str, size: int) -> str:
+    path = join(directory, name)
+    with open(path, "wb") as fp:
+        fp.write(np.random.default_rng(0).bytes(size))
+    return path
+
+
+class MockOpenAIServer:
+    """OpenAI兼容的 /v1/chat/completions，回复固定内容
+    - delay: 模拟的模型耗时（秒）
+    """
+
+    def __init__(self, reply: str = "ok", delay: float = 0.0) -> None:
+        self.reply = reply
+        self.delay = delay
+        self.requests: list[dict] = []
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = loads(self.rfile.read(int(self.headers["Content-Length"])))
+                mock.requests.append(body)
+                if mock.delay:
+                    time.sleep(mock.delay)
+                data = dumps(
+                    {
+                        "id": "chatcmpl-mock",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body.get("model", ""),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": mock.reply},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
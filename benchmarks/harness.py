@@ -0,0 +1,156 @@
+"""基准测试的计时、内存统计与基线比较"""
+import platform
+import time
+import tracemalloc
+from importlib.metadata import PackageNotFoundError, version
+from json import dumps, load
+from typing import Callable
+
+
+class Bench:
+    def __init__(self, name: str, func: Callable, setup: Callable = None, group: str = "") -> None:
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.group = group
+
+
+class Suite:
+    """注册并运行基准，每个样本为一批调用的平均耗时
+    - min_time: 每个基准的最短采样时间（秒）
+    - batch_time: 单个样本的最短耗时（秒），快速函数会自动增大批量
+    """
+
+    def __init__(self, min_time: float = 1.0, batch_time: float = 0.0002, max_samples: int = 2000) -> None:
+        self.min_time = min_time
+        self.batch_time = batch_time
+        self.max_samples = max_samples
+        self.benches: list[Bench] = []
+        self.skipped: dict[str, str] = {}
+
+    def add(self, name: str, func: Callable, setup: Callable = None):
+        """setup() 的返回值作为 func 的参数，不计入耗时"""
+        self.benches.append(Bench(name, func, setup))
+
+    def skip(self, name: str, reason: str):
+        self.skipped[name] = reason
+
+    def _calibrate(self, call: Callable) -> int:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                call()
+            if time.perf_counter() - start >= self.batch_time or number >= 1 << 20:
+                return number
+            number *= 2
+
+    def measure(self, bench: Bench) -> dict:
+        args = bench.setup() if bench.setup else None
+        call = (lambda: bench.func(args)) if bench.setup else bench.func
+        number = self._calibrate(call)
+
+        samples = []
+        start = time.perf_counter()
+        while len(samples) < self.max_samples and (
+            time.perf_counter() - start < self.min_time or len(samples) < 5
+        ):
+            batch = time.perf_counter_ns()
+            for _ in range(number):
+                call()
+            samples.append((time.perf_counter_ns() - batch) / number)
+        samples.sort()
+
+        tracemalloc.start()
+        try:
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        mean = sum(samples) / len(samples)
+        return {
+            "ops": 1e9 / mean,
+            "mean_ns": mean,
+            "p50_ns": percentile(samples, 50),
+            "p99_ns": percentile(samples, 99),
+            "peak_bytes": peak,
+            "samples": len(samples),
+            "batch": number,
+        }
+
+    def run(self, pattern: str = None, log: Callable[[str], None] = print) -> dict:
+        results = {}
+        for bench in self.benches:
+            if pattern and pattern not in bench.name:
+                continue
+            result = results[bench.name] = self.measure(bench)
+            log(format_result(bench.name, result))
+        for name, reason in self.skipped.items():
+            if not pattern or pattern in name:
+                log(f"{name:<44} skipped: {reason}")
+        return results
+
+
+def percentile(sorted_samples: list[float], per: float) -> float:
+    index = min(len(sorted_samples) - 1, round(per / 100 * (len(sorted_samples) - 1)))
+    return sorted_samples[index]
+
+
+def format_time(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f"{name:<44}{result['ops']:>14,.1f} ops/s"
+        f"  p50 {format_time(result['p50_ns']):>9}"
+        f"  p99 {format_time(result['p99_ns']):>9}"
+        f"  peak {result['peak_bytes'] / 1024:>10,.1f} KiB"
+    )
+
+
+def environment() -> dict:
+    packages = {}
+    for name in ("numpy", "opencv-python", "opencv-python-headless", "paddleocr"):
+        try:
+            packages[name] = version(name)
+        except PackageNotFoundError:
+            pass
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "packages": packages,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save_report(path: str, results: dict):
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write(dumps({"environment": environment(), "results": results}, indent=4))
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as fp:
+        return load(fp)["results"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.1) -> list[str]:
+    """ops/s 下降或 p99 上升超过 tolerance 视为回退，返回回退的描述"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        ops_ratio = result["ops"] / base["ops"]
+        p99_ratio = result["p99_ns"] / base["p99_ns"] if base["p99_ns"] else 1.0
+        if ops_ratio < 1 - tolerance or p99_ratio > 1 + tolerance * 2:
+            regressions.append(
+                f"{name}: ops/s {base['ops']:,.1f} -> {result['ops']:,.1f} ({ops_ratio - 1:+.1%}),"
+                f" p99 {format_time(base['p99_ns'])} -> {format_time(result['p99_ns'])}"
+            )
+    return regressions
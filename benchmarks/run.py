@@ -0,0 +1,61 @@
+"""运行基准并与基线比较
+
+python -m benchmarks.run                         # 全部运行
+python -m benchmarks.run -k match -o out.json    # 过滤并保存JSON
+python -m benchmarks.run --baseline base.json    # 与基线比较，回退时返回1
+python -m benchmarks.run --replay record_dir     # 额外使用录制的设备会话
+"""
+import argparse
+import pkgutil
+import sys
+from importlib import import_module
+from os.path import dirname
+
+from .harness import Suite, compare, load_report, save_report
+
+
+def discover() -> list:
+    return [
+        import_module(f"benchmarks.{info.name}")
+        for info in pkgutil.iter_modules([dirname(__file__)])
+        if info.name.startswith("bench_")
+    ]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("-k", "--filter", help="只运行名称包含该字符串的基准")
+    parser.add_argument("-o", "--output", help="结果保存为JSON")
+    parser.add_argument("--baseline", help="用于比较的基线JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="将结果写入 --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的性能波动比例")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个基准的采样时间（秒）")
+    parser.add_argument("--replay", help="RecordBackend 录制的目录")
+    options = parser.parse_args(argv)
+
+    suite = Suite(min_time=options.min_time)
+    modules = discover()
+    if options.filter:
+        # 基准名以模块名开头，例如 match.* 来自 bench_match
+        prefix = options.filter.split(".")[0]
+        selected = [i for i in modules if i.__name__.endswith(f"bench_{prefix}")]
+        modules = selected if selected else modules
+    for module in modules:
+        module.register(suite, options)
+    results = suite.run(options.filter)
+
+    if options.output:
+        save_report(options.output, results)
+    if options.baseline and options.save_baseline:
+        save_report(options.baseline, results)
+        return 0
+    if options.baseline:
+        regressions = compare(results, load_report(options.baseline), options.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())